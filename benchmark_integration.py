@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LangExtractIntegratorのベンチマーク
+
+乱数のシードを固定して、LangExtractの出力に近い合成JSONL（日本語のテキスト、統合キーの値の重複、
+数値属性、入れ子の辞書を含む）を作成し、抽出データ数ごとに統合処理の段階
+（load_jsonl、group_extractions、integrate_group、save_json）別の処理時間、
+スループット、ピークメモリ使用量（RSS）を計測します。
+--codecで複数のJSONライブラリ（json_codec）を指定すると、同じデータでそれぞれ計測して速度を比較します。
+結果はJSONファイルに保存し、リリース間の比較に使用します。
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import json_codec
+from json_integration import LangExtractIntegrator
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# 既定の計測サイズ（抽出データ数）
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# 既定の結果ファイル
+DEFAULT_OUTPUT = Path("out") / "benchmark_integration.json"
+
+# 合成データの語彙
+_PRODUCT_WORDS = ['スマートスピーカー', '空気清浄機', 'ロボット掃除機', '電動自転車', '体組成計',
+                  '見守りカメラ', '電子ペーパー端末', 'ワイヤレスイヤホン', '蓄電池', '給湯器']
+_COMPANY_WORDS = ['テック', 'ホーム', 'エナジー', 'モビリティ', 'ヘルスケア', 'ソリューションズ']
+_CATEGORIES = ['スマートホーム', '家電', 'ヘルスケア', 'エネルギー', 'モビリティ', 'セキュリティ']
+_APPLICATIONS = ['家庭用', '業務用', '医療用', '教育用', '車載用']
+_CLASSES = ['product', 'company', 'market', 'metric', 'feature', 'issue']
+_UNITS = ['億円', '%', '万台', 'W', 'kg', '円']
+_SENTENCES = ['{name}の国内出荷台数は前年比で増加した。',
+              '{name}は{category}市場で高いシェアを持つ。',
+              '{name}の新モデルが{year}年に発売される予定である。',
+              '{name}に関する不具合が複数報告されている。',
+              '{name}の{application}向けの需要が拡大している。']
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """現在のプロセスのピークRSS（バイト）。取得できない環境ではNone"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト単位、macOSはバイト単位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _make_extraction(rng: random.Random, pool_size: int) -> Dict[str, Any]:
+    """合成の抽出データを1件作成する"""
+    index = rng.randrange(pool_size)
+    name = f"{_PRODUCT_WORDS[index % len(_PRODUCT_WORDS)]}{index}"
+    category = rng.choice(_CATEGORIES)
+    application = rng.choice(_APPLICATIONS)
+    year = rng.randint(2018, 2030)
+    attributes: Dict[str, Any] = {}
+
+    roll = rng.random()
+    if roll < 0.2:
+        # 統合キーを持たない個別オブジェクト
+        attributes['note'] = rng.choice(['参考情報', '未確認', '推定値'])
+    else:
+        # 表記ゆれのある統合キー
+        key = rng.choice(['product_name', 'product name', 'model_name', 'model name'])
+        if roll < 0.21:
+            # 隣接する値と連結するリスト値（グループの結合を発生させる）
+            neighbour = (index + 1) % pool_size
+            attributes[key] = [name, f"{_PRODUCT_WORDS[neighbour % len(_PRODUCT_WORDS)]}{neighbour}"]
+        else:
+            attributes[key] = name
+        if rng.random() < 0.3:
+            # 製品名と同じグループに属する企業名
+            attributes['company_name'] = f"株式会社{_COMPANY_WORDS[index % len(_COMPANY_WORDS)]}{index}"
+        if rng.random() < 0.1:
+            # categoryも統合キーのため、値の種類が少ない分類は無効値（N/A）とする
+            attributes['category'] = 'N/A'
+        if rng.random() < 0.5:
+            attributes['segment'] = category
+
+    if rng.random() < 0.4:
+        # 数値属性
+        attributes['value'] = str(round(rng.uniform(0.1, 5000), 1))
+        attributes['unit'] = rng.choice(_UNITS)
+        attributes['year'] = str(year)
+    if rng.random() < 0.15:
+        # 入れ子の辞書
+        attributes['details'] = {
+            '仕様': {'重量': f"{rng.randint(1, 50)}kg", '消費電力': f"{rng.randint(5, 2000)}W"},
+            '地域': rng.sample(['関東', '関西', '中部', '九州', '北海道'], 2),
+        }
+    if rng.random() < 0.2:
+        attributes['features'] = rng.sample(['省エネ', '音声操作', '遠隔操作', '自動更新', '防水'], 2)
+
+    start = rng.randrange(10_000)
+    text = rng.choice(_SENTENCES).format(name=name, category=category, year=year,
+                                         application=application)
+    return {
+        'extraction_class': rng.choice(_CLASSES),
+        'extraction_text': text,
+        'char_interval': {'start_pos': start, 'end_pos': start + len(text)},
+        'alignment_status': 'match_exact',
+        'extraction_index': None,
+        'group_index': None,
+        'description': None,
+        'attributes': attributes,
+    }
+
+
+def generate_jsonl(output_file: str, num_extractions: int, seed: int = 0,
+                   extractions_per_document: int = 50) -> None:
+    """
+    合成のLangExtract出力JSONLを作成する
+
+    同じnum_extractionsとseedからは常に同じファイルが作成される。
+
+    Args:
+        output_file: 出力ファイルのパス
+        num_extractions: 抽出データの件数
+        seed: 乱数のシード
+        extractions_per_document: 1行（1文書）あたりの抽出データ数
+    """
+    rng = random.Random(seed)
+    # 統合キーの値の種類数（1グループあたり平均25件程度になるようにする）
+    pool_size = max(10, num_extractions // 25)
+    written = 0
+    with open(output_file, 'w', encoding='utf-8') as f:
+        while written < num_extractions:
+            count = min(extractions_per_document, num_extractions - written)
+            extractions = [_make_extraction(rng, pool_size) for _ in range(count)]
+            document = {'extractions': extractions, 'text': '', 'document_id': f"doc_{written}"}
+            f.write(json.dumps(document, ensure_ascii=False))
+            f.write('\n')
+            written += count
+
+
+def _phase(phases: Dict[str, Dict[str, float]], name: str, start: float, count: int) -> float:
+    """段階の処理時間とスループット（件/秒）を記録し、現在時刻を返す"""
+    now = time.perf_counter()
+    seconds = now - start
+    phases[name] = {'seconds': seconds, 'per_second': count / seconds if seconds > 0 else None}
+    return now
+
+
+def run_benchmark(num_extractions: int, seed: int = 0, streaming: bool = False,
+                  work_dir: Optional[str] = None, codec: Optional[str] = None) -> Dict[str, Any]:
+    """
+    1つのサイズについてベンチマークを実行する
+
+    ピークRSSを正しく計測するため、サイズごとに別プロセスで実行することを想定している。
+
+    Args:
+        num_extractions: 抽出データの件数
+        seed: 乱数のシード
+        streaming: process_file_streamingで処理するかどうか
+        work_dir: 合成データと出力を置く一時ディレクトリの親（Noneの場合はシステムの既定）
+        codec: 使用するJSONライブラリ（Noneの場合はjson_codecの既定）
+
+    Returns:
+        計測結果の辞書
+    """
+    json_codec.set_backend(codec)
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        input_file = os.path.join(tmp_dir, 'input.jsonl')
+        output_file = os.path.join(tmp_dir, 'output.json')
+
+        start = time.perf_counter()
+        generate_jsonl(input_file, num_extractions, seed)
+        generate_seconds = time.perf_counter() - start
+        input_bytes = os.path.getsize(input_file)
+        baseline_rss = _peak_rss_bytes()
+
+        integrator = LangExtractIntegrator()
+        phases: Dict[str, Dict[str, float]] = {}
+        # 統合処理の進捗表示は計測対象外
+        with contextlib.redirect_stdout(io.StringIO()):
+            total_start = time.perf_counter()
+            if streaming:
+                start = total_start
+                integrator.save_json(output_file, integrator.process_file_streaming(input_file))
+                _phase(phases, 'process_file_streaming+save_json', start, num_extractions)
+                groups = len(integrator.integrated_objects)
+                standalone = integrator.standalone_count
+            else:
+                # process_fileと同じ手順を段階ごとに計測する
+                start = total_start
+                extractions = integrator.load_jsonl(input_file)
+                start = _phase(phases, 'load_jsonl', start, num_extractions)
+                grouped = integrator.group_extractions(extractions)
+                start = _phase(phases, 'group_extractions', start, num_extractions)
+                integrated = [integrator.integrate_group(key, members) for key, members in grouped.items()]
+                integrated.extend(integrator.integrate_standalone_objects())
+                start = _phase(phases, 'integrate_group', start, num_extractions)
+                integrator.save_json(output_file, integrated)
+                _phase(phases, 'save_json', start, len(integrated))
+                groups = len(grouped)
+                standalone = len(integrator.standalone_objects)
+            total_seconds = time.perf_counter() - total_start
+        output_bytes = os.path.getsize(output_file)
+        with open(output_file, 'rb') as f:
+            output_sha256 = hashlib.sha256(f.read()).hexdigest()
+
+    return {
+        'extractions': num_extractions,
+        'mode': 'streaming' if streaming else 'in_memory',
+        'codec': json_codec.get_backend(),
+        'seed': seed,
+        'input_bytes': input_bytes,
+        'output_bytes': output_bytes,
+        'output_sha256': output_sha256,
+        'groups': groups,
+        'standalone_objects': standalone,
+        'generate_seconds': generate_seconds,
+        'total_seconds': total_seconds,
+        'extractions_per_second': num_extractions / total_seconds if total_seconds > 0 else None,
+        'phases': phases,
+        'baseline_rss_bytes': baseline_rss,
+        'peak_rss_bytes': _peak_rss_bytes(),
+    }
+
+
+def _run_isolated(num_extractions: int, seed: int, streaming: bool,
+                  work_dir: Optional[str], codec: Optional[str]) -> Dict[str, Any]:
+    """ピークRSSが他のサイズの計測の影響を受けないよう、新しいプロセスで実行する"""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(run_benchmark, num_extractions, seed, streaming, work_dir, codec).result()
+
+
+def _format_bytes(size: Optional[int]) -> str:
+    if size is None:
+        return 'n/a'
+    return f"{size / (1024 * 1024):.1f} MiB"
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='LangExtractIntegratorのベンチマーク（合成データ）')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='計測する抽出データ数（既定値: 10000 100000 1000000、最大10000000程度を想定）')
+    parser.add_argument('--seed', type=int, default=0, help='合成データの乱数シード（既定値: 0）')
+    parser.add_argument('--stream', action='store_true',
+                        help='process_file_streamingで処理する（1,000万件など大きなサイズ向け）')
+    parser.add_argument('--work-dir', help='合成データを置く一時ディレクトリの親')
+    parser.add_argument('--codec', nargs='+', choices=json_codec.AVAILABLE_BACKENDS,
+                        default=[json_codec.get_backend()],
+                        help='計測するJSONライブラリ（複数指定すると最初のものに対する速度比を表示、'
+                             f'既定値: {json_codec.get_backend()}）')
+    parser.add_argument('-o', '--output', default=str(DEFAULT_OUTPUT),
+                        help=f'結果のJSONファイル（既定値: {DEFAULT_OUTPUT}）')
+    args = parser.parse_args()
+
+    integrator = LangExtractIntegrator()
+    report = {
+        'benchmark': 'json_integration',
+        'created_at': datetime.now().isoformat(),
+        'config': integrator.config_fingerprint(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [],
+    }
+
+    for size in args.sizes:
+        baseline = None
+        for codec in args.codec:
+            print(f"Benchmarking {size} extractions ({'streaming' if args.stream else 'in-memory'}, {codec})...")
+            result = _run_isolated(size, args.seed, args.stream, args.work_dir, codec)
+            report['results'].append(result)
+            for name, phase in result['phases'].items():
+                per_second = f"{phase['per_second']:,.0f}/s" if phase['per_second'] else 'n/a'
+                speedup = ''
+                if baseline is not None:
+                    speedup = f", {baseline['phases'][name]['seconds'] / phase['seconds']:.2f}x vs {baseline['codec']}"
+                print(f"  {name}: {phase['seconds']:.3f}s ({per_second}{speedup})")
+            print(f"  total: {result['total_seconds']:.3f}s, "
+                  f"{result['extractions_per_second']:,.0f} extractions/s, "
+                  f"peak RSS {_format_bytes(result['peak_rss_bytes'])}, {result['groups']} groups")
+            if baseline is None:
+                baseline = result
+            elif result['output_sha256'] != baseline['output_sha256']:
+                print(f"  Warning: output differs from {baseline['codec']}")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Saved benchmark results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽出パイプラインのオフラインベンチマーク
+
+スタブLLMプロバイダー（stub_provider.py）を使用して、GeminiやOllamaを呼び出さずに
+text_analyzer_report.py（--concurrencyごと）とtext_analyzer_bugtickets.py（--batch-tokensごと）を
+合成の入力文書で実行し、1秒あたりの処理文書数、スケジューリングのオーバーヘッド、
+結果の保存と可視化にかかる時間を計測します。結果はJSONファイルに保存します。
+
+各設定は一時ディレクトリを作業ディレクトリとして別プロセスで実行します。
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from stub_provider import STUB_PROVIDER_NAME
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPORT_SCRIPT = SCRIPT_DIR / "text_analyzer_report.py"
+BUGTICKETS_SCRIPT = SCRIPT_DIR / "text_analyzer_bugtickets.py"
+
+# 既定の結果ファイル
+DEFAULT_OUTPUT = Path("out") / "benchmark_pipeline.json"
+
+# 結果の保存と可視化の段階（pipeline_metricsの段階名）
+IO_STAGES = ('save', 'visualize', 'filter')
+
+_COMPANIES = ['テックコープ', 'ホームコネクト', 'エナジーワークス', 'モビリティラボ', 'ヘルスケアシステムズ']
+_PRODUCTS = ['スマートスピーカー', '空気清浄機', 'ロボット掃除機', '見守りカメラ', '蓄電池']
+_MARKETS = ['国内', '北米', '欧州', 'アジア']
+_COMPONENTS = ['ファームウェア', '通信モジュール', '電源回路', '管理画面', '同期処理']
+
+
+def make_report(rng: random.Random, index: int, sections: int) -> str:
+    """見出しで区切られた合成の市場レポートを作成する"""
+    lines = [f"# 市場レポート{index}", ""]
+    for section in range(1, sections + 1):
+        company = rng.choice(_COMPANIES)
+        product = rng.choice(_PRODUCTS)
+        lines.append(f"## {rng.choice(_MARKETS)}市場 {section}")
+        lines.append(f"{company}の{product}は{rng.randint(2020, 2030)}年に"
+                     f"{rng.randint(1, 500)}億円の売上を見込んでいる。")
+        lines.append(f"{product}の市場シェアは{rng.randint(1, 60)}%で、{company}が首位である。")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def make_ticket(rng: random.Random, index: int) -> str:
+    """自由記述の合成不具合チケットを作成する（定型フォーマットではないためLLMで抽出される）"""
+    component = rng.choice(_COMPONENTS)
+    product = rng.choice(_PRODUCTS)
+    return (f"{product}の{component}で不具合が発生しました（チケット{index}）。\n"
+            f"再起動後に{component}が応答しなくなり、ユーザーの操作が反映されません。\n"
+            f"発生頻度は{rng.randint(1, 10)}回に1回程度で、最新のファームウェアでも再現します。\n")
+
+
+def write_inputs(input_dir: Path, kind: str, documents: int, sections: int, seed: int) -> None:
+    """合成の入力文書をinput_dirに作成する"""
+    rng = random.Random(seed)
+    input_dir.mkdir(parents=True, exist_ok=True)
+    for index in range(1, documents + 1):
+        text = make_report(rng, index, sections) if kind == 'report' else make_ticket(rng, index)
+        (input_dir / f"{kind}_{index:05d}.md").write_text(text, encoding='utf-8')
+
+
+def _run_script(script: Path, work_dir: Path, script_args: List[str], env: Dict[str, str]) -> float:
+    """作業ディレクトリでスクリプトを実行し、経過時間（秒）を返す"""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, str(script)] + script_args, cwd=work_dir, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"{script.name} failed with exit code {completed.returncode}:\n"
+                           f"{completed.stdout[-2000:]}")
+    return elapsed
+
+
+def run_case(kind: str, setting: int, documents: int, sections: int, seed: int,
+             env: Dict[str, str], html: bool, startup_seconds: float) -> Dict[str, Any]:
+    """
+    1つの設定でパイプラインを実行して計測する
+
+    Args:
+        kind: 'report'（--concurrencyを変える）または'bugtickets'（--batch-tokensを変える）
+        setting: --concurrencyまたは--batch-tokensの値
+        documents: 入力文書数
+        sections: レポート1件あたりのセクション数
+        seed: 合成データの乱数シード
+        env: スクリプトに渡す環境変数（スタブの設定を含む）
+        html: HTMLの可視化も作成するかどうか
+        startup_seconds: 入力がない場合の実行時間（インタープリタとimportの時間）
+
+    Returns:
+        計測結果の辞書
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = Path(tmp_dir)
+        write_inputs(work_dir / "input", kind, documents, sections, seed)
+        script_args = ['--stub', '--no-cache']
+        if not html:
+            script_args.append('--no-html')
+
+        result: Dict[str, Any] = {'kind': kind, 'documents': documents}
+        if kind == 'report':
+            metrics_file = work_dir / "metrics.json"
+            script_args += ['--concurrency', str(setting), '--metrics', str(metrics_file)]
+            wall = _run_script(REPORT_SCRIPT, work_dir, script_args, env)
+            with open(metrics_file, 'r', encoding='utf-8') as f:
+                aggregate = json.load(f)['aggregate']
+            stage_seconds = aggregate['stage_seconds']
+            busy = sum(stage_seconds.values())
+            pipeline_seconds = aggregate['wall_seconds']
+            result.update({
+                'concurrency': setting,
+                'stage_seconds': stage_seconds,
+                'io_seconds': sum(stage_seconds.get(stage, 0.0) for stage in IO_STAGES),
+                # 各段階の合計時間を並列数で割った理想時間との差（待ち合わせや逐次処理の時間）
+                'scheduler_overhead_seconds': max(0.0, pipeline_seconds - busy / setting),
+                'pipeline_seconds': pipeline_seconds,
+                'extractions': aggregate['extractions'],
+                'errors': aggregate['errors'],
+            })
+        else:
+            script_args += ['--no-template', '--batch-tokens', str(setting)]
+            wall = _run_script(BUGTICKETS_SCRIPT, work_dir, script_args, env)
+            result['batch_tokens'] = setting
+
+        output_bytes = sum(path.stat().st_size for path in (work_dir / "out").glob("*") if path.is_file())
+        processing = max(wall - startup_seconds, 1e-9)
+        result.update({
+            'wall_seconds': wall,
+            'processing_seconds': processing,
+            'documents_per_second': documents / processing,
+            'output_bytes': output_bytes,
+        })
+        return result
+
+
+def measure_startup(script: Path, env: Dict[str, str]) -> float:
+    """入力文書がない状態でスクリプトを実行し、起動にかかる時間を計測する"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        return _run_script(script, Path(tmp_dir), ['--stub', '--no-cache'], env)
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='スタブLLMを使用した抽出パイプラインのベンチマーク')
+    parser.add_argument('--documents', type=int, default=20, help='入力文書数（既定値: 20）')
+    parser.add_argument('--sections', type=int, default=4, help='レポート1件あたりのセクション数（既定値: 4）')
+    parser.add_argument('--latency', type=float, default=0.5,
+                        help='スタブLLMの1リクエストあたりの応答時間（秒、既定値: 0.5）')
+    parser.add_argument('--jitter', type=float, default=0.1,
+                        help='応答時間のゆらぎの幅（秒、既定値: 0.1）')
+    parser.add_argument('--concurrency', type=int, nargs='*', default=[1, 2, 4, 8],
+                        help='text_analyzer_report.pyで計測する--concurrencyの値（既定値: 1 2 4 8）')
+    parser.add_argument('--batch-tokens', type=int, nargs='*', default=[0, 1000, 4000],
+                        help='text_analyzer_bugtickets.pyで計測する--batch-tokensの値（既定値: 0 1000 4000）')
+    parser.add_argument('--html', action='store_true', help='HTMLの可視化も作成して計測に含める')
+    parser.add_argument('--seed', type=int, default=0, help='合成データの乱数シード（既定値: 0）')
+    parser.add_argument('-o', '--output', default=str(DEFAULT_OUTPUT),
+                        help=f'結果のJSONファイル（既定値: {DEFAULT_OUTPUT}）')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.update({
+        'LLM_PROVIDER': STUB_PROVIDER_NAME,
+        'STUB_LLM_LATENCY': str(args.latency),
+        'STUB_LLM_JITTER': str(args.jitter),
+    })
+
+    report: Dict[str, Any] = {
+        'benchmark': 'pipeline',
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'documents': args.documents,
+            'sections': args.sections,
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'html': args.html,
+            'seed': args.seed,
+        },
+        'results': [],
+    }
+
+    cases = [('report', value) for value in args.concurrency]
+    cases += [('bugtickets', value) for value in args.batch_tokens]
+    startup: Dict[str, Optional[float]] = {}
+    for kind, setting in cases:
+        script = REPORT_SCRIPT if kind == 'report' else BUGTICKETS_SCRIPT
+        if kind not in startup:
+            startup[kind] = measure_startup(script, env)
+        label = f"--concurrency {setting}" if kind == 'report' else f"--batch-tokens {setting}"
+        print(f"Benchmarking {script.name} {label} ({args.documents} documents)...")
+        result = run_case(kind, setting, args.documents, args.sections, args.seed, env,
+                          args.html, startup[kind])
+        report['results'].append(result)
+        line = f"  {result['documents_per_second']:.2f} documents/s, wall {result['wall_seconds']:.2f}s"
+        if kind == 'report':
+            line += (f", scheduler overhead {result['scheduler_overhead_seconds']:.2f}s"
+                     f", output I/O {result['io_seconds']:.3f}s")
+        print(line)
+    report['startup_seconds'] = startup
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Saved benchmark results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽出スクリプトのデバッグ出力
+
+--debug指定時のメッセージを、呼び出し元のスレッドでは整形せずにキューに入れ、
+バックグラウンドの書き込みスレッド（QueueListener）で整形してコンソールに表示し、
+ログファイルが設定されている場合はJSON Lines形式でも書き込みます。
+抽出処理のスレッドは、抽出結果全体のような大きな値の文字列化や出力を待ちません。
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+class JsonLogWriter(logging.Handler):
+    """
+    デバッグ出力をコンソールに表示し、ログファイルにJSON Lines形式で書き込むハンドラー
+
+    QueueListenerのバックグラウンドスレッドで動作する。console属性がTrueのレコードは標準出力に表示し、
+    log_file属性のあるレコードはそのファイルに書き込む（メッセージの整形は1レコードにつき1回）。
+    action属性が'open'のレコードはファイルを新規作成し、'close'のレコードはファイルを閉じる。
+    """
+    def __init__(self):
+        super().__init__()
+        self._files = {}
+
+    def _close(self, path):
+        f = self._files.pop(path, None)
+        if f:
+            f.close()
+
+    def emit(self, record):
+        try:
+            path = record.log_file
+            action = getattr(record, 'action', None)
+            if action == 'open':
+                self._close(path)
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                self._files[path] = open(path, 'w', encoding='utf-8')
+                return
+            if action == 'close':
+                self._close(path)
+                return
+
+            message = record.getMessage()
+            if getattr(record, 'console', False):
+                sys.stdout.write(message + "\n")
+                sys.stdout.flush()
+            if not path:
+                return
+            f = self._files.get(path)
+            if f is None:
+                f = self._files[path] = open(path, 'a', encoding='utf-8')
+            entry = {
+                'time': datetime.fromtimestamp(record.created).isoformat(),
+                'level': record.levelname,
+                'thread': record.threadName,
+                'message': message,
+            }
+            entry.update(getattr(record, 'fields', None) or {})
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        for path in list(self._files):
+            self._close(path)
+        super().close()
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    レコードを整形せずにキューに入れるQueueHandler
+
+    既定のprepareは呼び出し元のスレッドでメッセージを整形するため、整形を行わずにそのまま渡す。
+    メッセージの整形（record.getMessage）はJsonLogWriterが書き込みスレッドで行う。
+    キューは同じプロセス内のスレッド間でのみ使用するため、レコードをpickle可能にする必要はない。
+    """
+    def prepare(self, record):
+        return record
+
+
+class DebugLogger:
+    """
+    デバッグ出力の出力先を管理するクラス
+
+    ログファイルはスレッドごとに保持するため、複数ファイルを並行処理する場合も
+    各ファイルのログはそれぞれのログファイルに書き込まれる。
+    メッセージと引数は整形せずにキューに入れるだけで、整形、コンソールへの表示、JSONへの変換、
+    ファイルへの書き込みはバックグラウンドのスレッドで行うため、抽出処理を待たせない。
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._listener = None
+        self.logger = logging.getLogger("debug")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+
+    def _start(self):
+        """最初の出力時にバックグラウンドの書き込みスレッドを開始する"""
+        with self._lock:
+            if self._listener is None:
+                log_queue = queue.SimpleQueue()
+                self.logger.addHandler(DeferredQueueHandler(log_queue))
+                self._listener = logging.handlers.QueueListener(log_queue, JsonLogWriter())
+                self._listener.start()
+                atexit.register(self.close)
+
+    def close(self):
+        """キューに残っている出力をすべて書き込んでから書き込みスレッドを終了する"""
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+            for handler in list(self.logger.handlers):
+                self.logger.removeHandler(handler)
+
+    @property
+    def log_file(self):
+        return getattr(self._local, 'log_file', None)
+
+    @log_file.setter
+    def log_file(self, path):
+        # 現在のログファイルを閉じる
+        current = self.log_file
+        if current and self._listener:
+            self.logger.debug("", extra={'log_file': str(current), 'action': 'close'})
+
+        self._local.log_file = path
+        if path:
+            # 新しいログファイルを作成（書き込みスレッドで開く）
+            self._start()
+            self.logger.debug("", extra={'log_file': str(path), 'action': 'open'})
+
+    def debug(self, message, *args, console=False, **fields):
+        """
+        現在のスレッドのログファイルにレコードを書き込む
+
+        messageとargsはloggingと同様に message % args として書き込みスレッドで整形される。
+        consoleがTrueの場合は、書き込みスレッドで標準出力にも表示する（ログファイルが未設定でもよい）。
+        fieldsはJSONレコードにそのまま追加される（例: elapsed_seconds=1.2）。
+        """
+        path = self.log_file
+        if path or console:
+            self._start()
+            self.logger.debug(message, *args, extra={'log_file': str(path) if path else None,
+                                                     'console': console, 'fields': fields})
+
+
+# グローバルなデバッグロガーのインスタンス
+debug_logger = DebugLogger()
+
+
+def debug_print(debug_mode, *args, fields=None):
+    """
+    デバッグモードが有効な場合にのみメッセージを表示する
+
+    argsはprintと同様に空白区切りで文字列に変換するが、変換と表示は書き込みスレッドで行う
+    （そのため、通常のprintの出力より後に表示されることがある）。
+    デバッグモードが無効な場合は何もしないため、値はf-stringで埋め込まずに引数として渡す
+    （例: debug_print(debug_mode, "Response type:", type(result))）。
+    fieldsはデバッグログのJSONレコードに追加する値の辞書。
+    """
+    if not debug_mode:
+        return
+    debug_logger.debug(" ".join(["%s"] * len(args)), *args, console=True, **(fields or {}))
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+統合データのベクトル化とエクスポート
+
+LangExtractIntegratorの統合オブジェクトを埋め込み用のテキスト（text とattributes）に変換し、
+ネットワークを使わないハッシュ化TF-IDFベクトル（文字2〜3-gram）を計算して、
+メモリマップした.npyファイルとIDのサイドカー（JSONL）に書き出します。
+ベクトルはチャンク単位で計算して書き込むため、全件をメモリに保持しません。
+書き出したベクトルは np.load(..., mmap_mode='r') でコピーせずに一括で読み込めます。
+"""
+
+import argparse
+import json
+import sys
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from extraction_journal import atomic_output
+from json_integration import LangExtractIntegrator, OUTPUT_SUFFIXES
+
+
+# 出力ファイルの接尾辞（IDのサイドカーはJSON Lines形式だが、outディレクトリに置いても
+# json_integration.pyが抽出結果として読み込まないよう拡張子を.jsonlにしない）
+VECTORS_SUFFIX = "_embeddings.npy"
+IDS_SUFFIX = "_embeddings_ids.ndjson"
+
+# 既定のベクトルの次元数と1チャンクのオブジェクト数
+DEFAULT_DIMENSIONS = 512
+DEFAULT_CHUNK_SIZE = 4096
+
+
+def embedding_text(obj: Dict[str, Any]) -> str:
+    """
+    統合オブジェクトを埋め込み用のテキストに変換する
+
+    textの後に、attributesを1行に1つ「キー: 値」の形式で続ける（リストは「、」区切り）。
+
+    Args:
+        obj: 統合オブジェクト（id, classes, text, attributes）
+
+    Returns:
+        埋め込み用のテキスト
+    """
+    lines = [obj.get('text', '')]
+    for key, value in (obj.get('attributes') or {}).items():
+        if key == 'numeric_data':
+            value = ['/'.join(str(item) for item in row) for row in value]
+        if isinstance(value, list):
+            value = '、'.join(json.dumps(item, ensure_ascii=False) if isinstance(item, (dict, list)) else str(item)
+                             for item in value)
+        elif isinstance(value, dict):
+            value = json.dumps(value, ensure_ascii=False)
+        lines.append(f"{key}: {value}")
+    return '\n'.join(line for line in lines if line)
+
+
+class HashingVectorizer:
+    """
+    文字n-gramのハッシュ化TF-IDFベクトル化
+
+    n-gramをcrc32で次元数のバケットに割り当て（符号付き）、TFは1 + log(出現回数)、
+    IDFはlog((1 + 文書数) / (1 + 文書頻度)) + 1 とし、行ごとにL2正規化する。
+    語彙を持たず、同じ設定からは常に同じベクトルが得られる。
+    """
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS, ngram_range: Tuple[int, int] = (2, 3)):
+        """
+        初期化
+
+        Args:
+            dimensions: ベクトルの次元数
+            ngram_range: 文字n-gramの長さの範囲（最小, 最大）
+        """
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+        self.document_frequency = np.zeros(dimensions, dtype=np.int64)
+        self.document_count = 0
+
+    def features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        テキストのn-gramをバケットに割り当てる
+
+        Returns:
+            (バケット番号の配列, 符号付きの出現回数の配列)。バケット番号は重複しない
+        """
+        normalized = ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+        counts: Dict[int, int] = {}
+        low, high = self.ngram_range
+        for size in range(low, high + 1):
+            for start in range(len(normalized) - size + 1):
+                hashed = zlib.crc32(normalized[start:start + size].encode('utf-8'))
+                bucket = hashed % self.dimensions
+                sign = 1 if (hashed // self.dimensions) & 1 else -1
+                counts[bucket] = counts.get(bucket, 0) + sign
+        buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        return buckets, values
+
+    def partial_fit(self, texts: Iterable[str]) -> None:
+        """テキストの文書頻度を集計する（全件を渡した後にtransformを呼ぶ）"""
+        for text in texts:
+            buckets, _ = self.features(text)
+            self.document_frequency[buckets] += 1
+            self.document_count += 1
+
+    @property
+    def idf(self) -> np.ndarray:
+        return np.log((1.0 + self.document_count) / (1.0 + self.document_frequency)) + 1.0
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        """
+        テキストのリストをベクトルに変換する
+
+        Returns:
+            (テキスト数, 次元数)のfloat32配列（各行はL2正規化済み）
+        """
+        idf = self.idf
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float64)
+        for row, text in enumerate(texts):
+            buckets, values = self.features(text)
+            # 符号付きの出現回数の絶対値に対数をとったTFにIDFを掛ける（打ち消し合って0のバケットは0）
+            tf = 1.0 + np.log(np.maximum(np.abs(values), 1.0))
+            matrix[row, buckets] = np.sign(values) * tf * idf[buckets]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix.astype(np.float32)
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_integrated_objects(input_file: str, streaming: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    入力ファイルから統合オブジェクトを順に返す
+
+    *_integrated.json / *_integrated.jsonl はそのまま読み込み、それ以外のJSONL（LangExtractの出力）は
+    LangExtractIntegratorで統合してから返す。
+    """
+    name = Path(input_file).name
+    if name.endswith(OUTPUT_SUFFIXES['jsonl']):
+        with open(input_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif name.endswith(OUTPUT_SUFFIXES['json']):
+        with open(input_file, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+    else:
+        integrator = LangExtractIntegrator()
+        if streaming:
+            yield from integrator.process_file_streaming(input_file)
+        else:
+            yield from integrator.process_file(input_file)
+
+
+def export_embeddings(objects: Iterable[Dict[str, Any]], output_base: Path,
+                      dimensions: int = DEFAULT_DIMENSIONS, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    統合オブジェクトをベクトル化して保存する
+
+    1パス目で埋め込み用テキストをIDのサイドカーに書き出しながら文書頻度を集計し、
+    2パス目でサイドカーを読み直してチャンクごとにベクトルを計算し、メモリマップした.npyに書き込む。
+    どちらのファイルも一時ファイルに書き込んだ後でリネームする。
+
+    Args:
+        objects: 統合オブジェクト（イテレータでもよい）
+        output_base: 出力ファイル名の基部（<基部>_embeddings.npy と <基部>_embeddings_ids.ndjson を作成）
+        dimensions: ベクトルの次元数
+        chunk_size: 1回に計算するオブジェクト数
+
+    Returns:
+        書き出したベクトルの件数
+    """
+    output_base = Path(output_base)
+    vectors_file = output_base.with_name(output_base.name + VECTORS_SUFFIX)
+    ids_file = output_base.with_name(output_base.name + IDS_SUFFIX)
+
+    vectorizer = HashingVectorizer(dimensions)
+    with atomic_output(ids_file) as ids_tmp, atomic_output(vectors_file) as vectors_tmp:
+        # 1パス目: IDと埋め込み用テキストを書き出し、文書頻度を集計する
+        row = 0
+        with open(ids_tmp, 'w', encoding='utf-8') as f:
+            for chunk in _chunks(objects, chunk_size):
+                texts = [embedding_text(obj) for obj in chunk]
+                vectorizer.partial_fit(texts)
+                for obj, text in zip(chunk, texts):
+                    # IDは1つの入力ファイルの中でだけ一意（standalone_0などはファイルごとに振られる）のため、
+                    # ベクトル（.npy）の行に対応する行番号も記録する
+                    record = {'row': row, 'id': obj.get('id'), 'text': text}
+                    f.write(json.dumps(record, ensure_ascii=False))
+                    row += 1
+                    f.write('\n')
+        count = vectorizer.document_count
+
+        # 2パス目: チャンクごとにベクトルを計算してメモリマップに書き込む
+        vectors = open_memmap(str(vectors_tmp), mode='w+', dtype=np.float32, shape=(count, dimensions))
+        with open(ids_tmp, 'r', encoding='utf-8') as f:
+            row = 0
+            for chunk in _chunks(f, chunk_size):
+                texts = [json.loads(line)['text'] for line in chunk]
+                vectors[row:row + len(texts)] = vectorizer.transform(texts)
+                row += len(texts)
+        vectors.flush()
+        del vectors
+
+    return count
+
+
+def load_embeddings(output_base: Path) -> Tuple[List[Any], np.ndarray]:
+    """
+    export_embeddingsで保存したベクトルとIDを読み込む
+
+    ベクトルはメモリマップで開くため、ファイル全体をコピーせずに参照できる。
+
+    Returns:
+        (IDのリスト, (件数, 次元数)の読み取り専用配列)
+    """
+    output_base = Path(output_base)
+    vectors = np.load(str(output_base.with_name(output_base.name + VECTORS_SUFFIX)), mmap_mode='r')
+    with open(output_base.with_name(output_base.name + IDS_SUFFIX), 'r', encoding='utf-8') as f:
+        ids = [json.loads(line)['id'] for line in f]
+    return ids, vectors
+
+
+def default_output_base(input_path: Path) -> Path:
+    """入力ファイルに対応する出力ファイル名の基部（_integrated.json(l)や.jsonlを除いた名前）"""
+    name = input_path.name
+    for suffix in (OUTPUT_SUFFIXES['jsonl'], OUTPUT_SUFFIXES['json'], '.jsonl'):
+        if name.endswith(suffix):
+            return input_path.with_name(name[:-len(suffix)])
+    return input_path.with_suffix('')
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(
+        description='統合データを埋め込みベクトル（ハッシュ化TF-IDF）に変換してメモリマップ形式で保存する'
+    )
+    parser.add_argument('input_file',
+                        help='入力ファイル（*_integrated.json、*_integrated.jsonl、またはLangExtractの出力JSONL）')
+    parser.add_argument('-o', '--output',
+                        help='出力ファイル名の基部（既定値: 入力ファイル名から_integratedと拡張子を除いたもの）')
+    parser.add_argument('--dimensions', type=int, default=DEFAULT_DIMENSIONS,
+                        help=f'ベクトルの次元数（既定値: {DEFAULT_DIMENSIONS}）')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'1回にベクトル化するオブジェクト数（既定値: {DEFAULT_CHUNK_SIZE}）')
+    args = parser.parse_args()
+
+    input_path = Path(args.input_file)
+    if not input_path.exists():
+        print(f"Error: Input file does not exist: {args.input_file}")
+        sys.exit(1)
+
+    output_base = Path(args.output) if args.output else default_output_base(input_path)
+    count = export_embeddings(iter_integrated_objects(str(input_path)), output_base,
+                              args.dimensions, args.chunk_size)
+    print(f"Saved {count} vectors ({args.dimensions} dimensions) to "
+          f"{output_base.name}{VECTORS_SUFFIX} and {output_base.name}{IDS_SUFFIX}")
+
+
+if __name__ == "__main__":
+    main()
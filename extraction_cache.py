@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM抽出結果のキャッシュ
+
+lx.extractの入力（文書、プロンプト、examples、モデル設定）のハッシュをキーとして
+抽出結果のAnnotatedDocumentをディスクに保存し、同じ入力で再実行した場合は
+LLMを呼び出さずに保存済みの結果を返します。
+キャッシュの合計サイズが上限を超えた場合は、最も長く使われていないものから削除します（LRU）。
+"""
+
+import dataclasses
+import enum
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import langextract as lx
+
+from extraction_journal import atomic_output
+
+
+# キャッシュの既定の保存先と最大サイズ
+DEFAULT_CACHE_DIR = Path("out") / ".extraction_cache"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# キャッシュキーの版数（キャッシュの形式を変える場合に上げる）
+CACHE_KEY_VERSION = 1
+
+
+def _json_default(value: Any) -> Any:
+    """キャッシュキー計算用のJSON変換（Enumやdataclassを値に変換する）"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    return repr(value)
+
+
+def make_cache_key(text: str, prompt: str, examples: List[Any],
+                   model_config: Dict[str, Any]) -> str:
+    """
+    抽出リクエストのキャッシュキーを計算する
+
+    Args:
+        text: 抽出対象の文書
+        prompt: プロンプト
+        examples: few-shotのexamples（lx.data.ExampleDataのリスト）
+        model_config: lx.extractに渡すモデル設定（api_keyはキーに含めない）
+
+    Returns:
+        16進数のハッシュ文字列
+    """
+    payload = {
+        'version': CACHE_KEY_VERSION,
+        'text': text,
+        'prompt': prompt,
+        'examples': [
+            dataclasses.asdict(example) if dataclasses.is_dataclass(example) else example
+            for example in examples
+        ],
+        'model': {key: value for key, value in model_config.items() if key != 'api_key'},
+    }
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=_json_default)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ExtractionCache:
+    """
+    抽出結果のディスクキャッシュ
+
+    1件の抽出結果を1つのJSONファイルとして保存する。読み出し時に更新日時を更新し、
+    合計サイズがmax_bytesを超えた場合は更新日時の古いものから削除する。
+    複数スレッドから同時に使用できる。
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        初期化
+
+        Args:
+            cache_dir: キャッシュの保存先ディレクトリ
+            max_bytes: キャッシュの最大合計サイズ（バイト）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _path(self, key: str) -> Path:
+        # 1ディレクトリ内のファイル数が増えすぎないよう先頭2文字で分ける
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        キャッシュから抽出結果を取得する
+
+        Args:
+            key: make_cache_keyで計算したキー
+
+        Returns:
+            保存済みのAnnotatedDocument（キャッシュにない場合はNone）
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            os.utime(path)  # LRU用に最終使用日時を更新
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return lx.data_lib.dict_to_annotated_document(data)
+
+    def put(self, key: str, annotated_document: Any) -> None:
+        """
+        抽出結果をキャッシュに保存する
+
+        Args:
+            key: make_cache_keyで計算したキー
+            annotated_document: lx.extractの結果
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(lx.data_lib.annotated_document_to_dict(annotated_document),
+                             ensure_ascii=False)
+
+        with atomic_output(path) as tmp_file:
+            tmp_file.write_text(content, encoding='utf-8')
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += path.stat().st_size
+            self._evict()
+
+    def _evict(self) -> None:
+        """合計サイズが上限を超えていれば、最終使用日時の古いものから削除する"""
+        if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+            return
+
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        self._total_bytes = total
+
+
+def extract_with_cache(cache: Optional[ExtractionCache], text: str, prompt: str,
+                       examples: List[Any], model_config: Dict[str, Any],
+                       before_request=None) -> Any:
+    """
+    キャッシュを使ってlx.extractを実行する
+
+    Args:
+        cache: 使用するキャッシュ（Noneの場合は常にLLMを呼び出す）
+        text: 抽出対象の文書
+        prompt: プロンプト
+        examples: few-shotのexamples
+        model_config: lx.extractに渡すモデル設定
+        before_request: LLMを呼び出す直前に呼ぶ関数（レート制限などに使用、キャッシュヒット時は呼ばない）
+
+    Returns:
+        抽出結果のAnnotatedDocument
+    """
+    key = None
+    if cache is not None:
+        key = make_cache_key(text, prompt, examples, model_config)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    if before_request:
+        before_request()
+    result = lx.extract(
+        text_or_documents=text,
+        prompt_description=prompt,
+        examples=examples,
+        **model_config
+    )
+
+    if cache is not None:
+        cache.put(key, result)
+    return result
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽出処理の再開用ジャーナル
+
+入力文書ごとに、入力内容のハッシュ、処理状態（started、done、failed）、出力ファイルのパスを
+追記専用のログファイル（outディレクトリ内、1行に1件のJSON）に記録します。
+ファイル名の拡張子は.jsonlにしない（json_integration.pyが抽出結果として読み込まないようにするため）。
+抽出スクリプトを--resume付きで実行すると、前回までに完了した文書を省略し、
+失敗した文書と処理されていない文書（途中で異常終了したものを含む）だけを処理します。
+
+出力ファイルは一時ファイルに書き込んだ後でリネームするため、書きかけの *_results.jsonl が
+完了した出力として扱われることはありません。一時ファイル経由の書き込み（atomic_output）は
+統合結果、マニフェスト、索引、キャッシュ、計測結果など、他のモジュールの出力にも使用します。
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+
+# ジャーナルの形式の版数（形式を変える場合に上げる）
+JOURNAL_VERSION = 1
+
+# 処理状態
+STATUS_STARTED = "started"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def text_sha256(text: str) -> str:
+    """入力文書の内容のハッシュ（16進数）を返す"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@contextlib.contextmanager
+def atomic_output(path: Path) -> Iterator[Path]:
+    """
+    出力ファイルを一時ファイル経由で作成する
+
+    withブロックでは一時ファイルのパスに書き込む。ブロックが正常に終了した場合のみ、
+    一時ファイルの内容をディスクに反映（fsync）してから出力先にリネームし、例外が発生した場合は一時ファイルを削除する。
+    途中で異常終了しても、書きかけや中身が欠けたファイルが出力先の名前で残ることはない。
+    一時ファイル名はプロセスとスレッドごとに異なるため、同じ出力先に同時に書き込んでもよい（後に完了した方が残る）。
+
+    Args:
+        path: 出力ファイルのパス
+
+    Yields:
+        書き込み先の一時ファイルのパス
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        yield tmp_path
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def save_annotated_document(document: Any, jsonl_file: Path) -> None:
+    """
+    抽出結果1件をJSONLファイルに保存する（lx.io.save_annotated_documentsと同じ形式、一時ファイル経由）
+
+    Args:
+        document: 抽出結果のAnnotatedDocument
+        jsonl_file: 出力する *_results.jsonl のパス
+    """
+    # langextractの読み込みは時間がかかるため、atomic_outputだけを使うモジュールでは読み込まない
+    import langextract as lx
+
+    jsonl_file = Path(jsonl_file)
+    with atomic_output(jsonl_file) as tmp_file:
+        lx.io.save_annotated_documents([document], output_name=tmp_file.name, output_dir=str(jsonl_file.parent))
+
+
+class ExtractionJournal:
+    """
+    文書ごとの処理状態の追記専用ジャーナル
+
+    1行に1件の記録（JSON）を追記し、読み込み時は文書ごとに最後の記録を現在の状態とする。
+    異常終了により最終行が書きかけの場合は、その行を無視する。複数スレッドから同時に使用できる。
+    """
+
+    def __init__(self, path: Path):
+        """
+        初期化
+
+        Args:
+            path: ジャーナルファイルのパス
+        """
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # 最終行が書きかけ（改行で終わらない）の場合は、次の追記の前に改行を補う
+        self._torn = False
+        self.load()
+
+    def load(self) -> None:
+        """ジャーナルを読み込む（存在しない場合は空として扱う）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._torn = not line.endswith('\n')
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict) and entry.get('version') == JOURNAL_VERSION:
+                        self.entries[entry['document']] = entry
+        except FileNotFoundError:
+            return
+
+    def record(self, document: str, input_sha256: str, status: str,
+               outputs: Iterable[Path] = (), error: Optional[str] = None) -> None:
+        """
+        文書の処理状態を追記する
+
+        Args:
+            document: 文書の名前（入力ファイル名）
+            input_sha256: 入力内容のハッシュ
+            status: STATUS_STARTED、STATUS_DONE、STATUS_FAILEDのいずれか
+            outputs: 作成した出力ファイルのパス（STATUS_DONEの場合）
+            error: エラーメッセージ（STATUS_FAILEDの場合）
+        """
+        entry = {
+            'version': JOURNAL_VERSION,
+            'time': datetime.now().isoformat(),
+            'document': document,
+            'input_sha256': input_sha256,
+            'status': status,
+            'outputs': [str(path) for path in outputs],
+        }
+        if error is not None:
+            entry['error'] = error
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if self._torn:
+                    f.write("\n")
+                    self._torn = False
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries[document] = entry
+
+    def is_completed(self, document: str, input_sha256: str) -> bool:
+        """
+        文書が完了済みかどうかを返す
+
+        Args:
+            document: 文書の名前（入力ファイル名）
+            input_sha256: 入力内容の現在のハッシュ
+
+        Returns:
+            最後の記録がdoneで、入力内容が同じで、記録した出力ファイルがすべて存在する場合はTrue
+        """
+        with self._lock:
+            entry = self.entries.get(document)
+        if not entry or entry.get('status') != STATUS_DONE or entry.get('input_sha256') != input_sha256:
+            return False
+        return all(Path(path).exists() for path in entry.get('outputs', []))
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSONの読み書き（高速なライブラリがあれば使用）
+
+orjsonまたはmsgspecがインストールされていればJSONの解析と書き出しに使用し、
+ない場合は標準ライブラリのjsonを使用します。
+出力はどのライブラリでも json.dumps(obj, ensure_ascii=False, ...) と同一です。
+高速なライブラリと標準ライブラリで結果が異なる入力（NaN、64ビットを超える整数、
+指数表記になる浮動小数点数、文字列以外の辞書のキーなど）は標準ライブラリで処理します。
+
+環境変数JSON_CODEC（orjson、msgspec、json）で使用するライブラリを指定できます。
+"""
+
+import json
+import os
+import re
+from typing import Any, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+# 利用できるライブラリ（優先順）
+AVAILABLE_BACKENDS = tuple(name for name, module in (('orjson', orjson), ('msgspec', msgspec)) if module) + ('json',)
+
+# 標準ライブラリのreprが指数表記にならない浮動小数点数の範囲（この範囲外はorjsonと表記が異なる）
+_PLAIN_FLOAT_MIN = 1e-4
+_PLAIN_FLOAT_MAX = 1e16
+
+# 19桁以上の数字の並びの判定用（orjsonは64ビットを超える整数を浮動小数点数として解析する）
+# 数字を'0'に、それ以外のバイトを空白に置き換えてから'0'の連続を探す（正規表現より大幅に速い）
+_DIGIT_TABLE = bytes(0x30 if 0x30 <= byte <= 0x39 else 0x20 for byte in range(256))
+_LONG_DIGITS = b'0' * 19
+
+# orjsonの出力に標準ライブラリと表記が異なる浮動小数点数が含まれうるかの判定用
+# （orjsonは1e-4未満を0.0000...または指数表記で、1e16以上を指数表記で、NaNと無限大をnullで書き出す）
+_NUMBER_TABLE = bytes(0x30 if 0x30 <= byte <= 0x39 else byte if byte in b'e.' else 0x20 for byte in range(256))
+_NONPLAIN_FLOAT_MARKERS = (b'0e', b'0.0000')
+
+# インデント付きの出力の改行と字下げ（JSONの文字列中に改行は現れない）
+_INDENTED_COMMA = re.compile(r',\n *')
+_INDENTED_NEWLINE = re.compile(r'\n *')
+
+_COMPACT_SEPARATORS = (',', ':')
+_DEFAULT_SEPARATORS = (', ', ': ')
+_INDENT_SEPARATORS = (',', ': ')
+
+
+def _has_nonplain_float(obj: Any) -> bool:
+    """標準ライブラリと表記が異なりうる浮動小数点数（指数表記、NaN、無限大）を含むかどうか"""
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if value != 0 and not (_PLAIN_FLOAT_MIN <= abs(value) < _PLAIN_FLOAT_MAX):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class JsonCodec:
+    """
+    JSONの解析と書き出し
+
+    loads()は json.loads と、dumps()は ensure_ascii=False を指定した json.dumps と同じ結果を返す。
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            backend: 使用するライブラリ（'orjson'、'msgspec'、'json'。Noneの場合は利用できる中で最速のもの）
+        """
+        backend = backend or AVAILABLE_BACKENDS[0]
+        if backend not in AVAILABLE_BACKENDS:
+            raise ValueError(f"JSON backend is not available: {backend} (available: {', '.join(AVAILABLE_BACKENDS)})")
+        self.backend = backend
+        if backend == 'msgspec':
+            self._decoder = msgspec.json.Decoder()
+
+    def loads(self, data: Any) -> Any:
+        """
+        JSON文字列を解析する
+
+        高速なライブラリで解析できない入力（NaNなど）と、64ビットを超える整数を含みうる入力（19桁以上の数字の並び）は
+        標準ライブラリで解析するため、結果と例外（json.JSONDecodeError）は json.loads と同じになる。
+
+        Args:
+            data: JSON文字列（strまたはUTF-8のbytes。ファイルをバイナリモードで読んだ行をそのまま渡すと速い）
+
+        Returns:
+            解析結果
+        """
+        if self.backend == 'json':
+            return json.loads(data)
+        try:
+            raw = data.encode('utf-8') if isinstance(data, str) else data
+        except UnicodeEncodeError:
+            # サロゲート文字を含む文字列
+            return json.loads(data)
+        if _LONG_DIGITS in raw.translate(_DIGIT_TABLE):
+            return json.loads(data)
+        if self.backend == 'orjson':
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                pass
+        elif self.backend == 'msgspec':
+            try:
+                return self._decoder.decode(raw)
+            except msgspec.DecodeError:
+                pass
+        return json.loads(data)
+
+    def dumps(self, obj: Any, indent: Optional[int] = None,
+              separators: Optional[Tuple[str, str]] = None) -> str:
+        """
+        JSON文字列に変換する
+
+        json.dumps(obj, ensure_ascii=False, indent=indent, separators=separators) と同じ文字列を返す。
+        orjsonは indent=2 と (',', ':')、既定の区切り文字の場合に使用し、それ以外は標準ライブラリを使用する。
+
+        Args:
+            obj: 変換するオブジェクト
+            indent: インデント幅（Noneの場合は1行）
+            separators: 要素とキーの区切り文字（Noneの場合はjson.dumpsの既定値）
+
+        Returns:
+            JSON文字列
+        """
+        if self.backend == 'orjson':
+            if indent is None:
+                fast = (separators or _DEFAULT_SEPARATORS) in (_COMPACT_SEPARATORS, _DEFAULT_SEPARATORS)
+            else:
+                fast = indent == 2 and (separators or _INDENT_SEPARATORS) == _INDENT_SEPARATORS
+            if fast:
+                compact = indent is None and separators == _COMPACT_SEPARATORS
+                try:
+                    raw = orjson.dumps(obj) if compact else orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+                except TypeError:
+                    # 64ビットを超える整数、文字列以外の辞書のキー、orjsonが扱えない型
+                    raw = None
+                if raw is not None and not self._may_differ(raw, obj):
+                    text = raw.decode('utf-8')
+                    if indent is None and not compact:
+                        # インデント付きの出力から改行と字下げを除いて既定の区切り文字にする
+                        text = _INDENTED_NEWLINE.sub('', _INDENTED_COMMA.sub(', ', text))
+                    return text
+        return json.dumps(obj, ensure_ascii=False, indent=indent, separators=separators)
+
+    @staticmethod
+    def _may_differ(raw: bytes, obj: Any) -> bool:
+        """
+        orjsonの出力が標準ライブラリと異なるかどうかを判定する
+
+        出力に該当しうる表記がある場合のみ（文字列中の一致を含む）、元のオブジェクトの浮動小数点数を調べる。
+        """
+        numbers = raw.translate(_NUMBER_TABLE)
+        if b'null' in raw or any(marker in numbers for marker in _NONPLAIN_FLOAT_MARKERS):
+            return _has_nonplain_float(obj)
+        return False
+
+
+_codec = JsonCodec(os.getenv('JSON_CODEC') or None)
+
+
+def get_backend() -> str:
+    """現在使用しているライブラリの名前を返す"""
+    return _codec.backend
+
+
+def set_backend(backend: Optional[str]) -> None:
+    """
+    使用するライブラリを切り替える
+
+    Args:
+        backend: 'orjson'、'msgspec'、'json'のいずれか（Noneの場合は利用できる中で最速のもの）
+    """
+    global _codec
+    _codec = JsonCodec(backend)
+
+
+def loads(data: Any) -> Any:
+    """JSON文字列を解析する（json.loadsと同じ結果）"""
+    return _codec.loads(data)
+
+
+def dumps(obj: Any, indent: Optional[int] = None, separators: Optional[Tuple[str, str]] = None) -> str:
+    """JSON文字列に変換する（ensure_ascii=Falseを指定したjson.dumpsと同じ結果）"""
+    return _codec.dumps(obj, indent=indent, separators=separators)
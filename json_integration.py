@@ -8,24 +8,437 @@ LangExtract出力JSON統合スクリプト
 オブジェクトをグループ化し、ベクトルDB化用の統合データを作成します。
 """
 
+import io
+import os
+import re
 import json
+import hashlib
+import heapq
+import pickle
 import argparse
 import sys
+import tempfile
+import time
+import itertools
+import contextlib
+import functools
+import zlib
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Set, Optional
+from typing import Dict, List, Any, Set, Optional, Iterator, Iterable
 from collections import defaultdict
 
+import json_codec
+from extraction_journal import atomic_output
+
+
+class GroupState:
+    """
+    グループ統合の途中状態
+
+    抽出データそのものを保持せず、統合結果に必要な情報だけを畳み込んで保持する。
+    ストリーミング処理ではグループ数に比例したメモリのみを使用する。
+    """
+
+    __slots__ = ('classes', 'merged', 'merged_index', 'numeric_tuples', 'texts', 'text_index')
+
+    def __init__(self):
+        """初期化"""
+        self.classes = {}   # 出現順を保持する集合として使用
+        self.merged = {}
+        self.merged_index = {}   # リスト化した属性のキー -> 値の指紋の集合
+        self.numeric_tuples = []
+        self.texts = []
+        self.text_index = None   # textsの近似重複判定用のインデックス（2件目の候補で作成）
+
+
+# ExtractionRecord.getで値がないことを表す番兵
+_MISSING = object()
+
+
+class ExtractionRecord:
+    """
+    統合処理で使用する抽出データのコンパクトな表現
+
+    JSONから読み込んだ辞書のうち、統合に必要なextraction_class、extraction_text、attributesだけを
+    __slots__で保持する。クラス名とattributesのキーはsys.internで共有し、キーの並びが同じ抽出データは
+    キーのタプルも共有する。短い文字列の値（"N/A"など）も共有する。
+    get()で辞書と同じように参照できるため、統合処理は辞書とこのレコードのどちらも受け付ける。
+    """
+
+    __slots__ = ('extraction_class', 'extraction_text', '_attribute_keys', '_attribute_values')
+
+    # 共有する文字列の値の最大長（長い文字列は重複が少ないため共有しない）
+    INTERN_MAX_LENGTH = 64
+
+    # 共有するキーの並びの最大数（スキーマが一定しない入力でもメモリ使用量が増え続けないようにする）
+    KEY_LAYOUT_CACHE_SIZE = 4096
+
+    def __init__(self, extraction_class: Any = _MISSING, extraction_text: Any = _MISSING,
+                 attributes: Optional[Dict[str, Any]] = None):
+        """
+        初期化
+
+        Args:
+            extraction_class: 抽出クラス名
+            extraction_text: 抽出テキスト
+            attributes: 属性の辞書
+        """
+        if isinstance(extraction_class, str):
+            extraction_class = sys.intern(extraction_class)
+        self.extraction_class = extraction_class
+        self.extraction_text = extraction_text
+        if attributes is None:
+            self._attribute_keys = self._attribute_values = None
+            return
+        self._attribute_keys = self._key_layout(tuple(attributes))
+        self._attribute_values = tuple(self._intern_value(value) for value in attributes.values())
+
+    @staticmethod
+    @functools.lru_cache(maxsize=KEY_LAYOUT_CACHE_SIZE)
+    def _key_layout(keys: tuple) -> tuple:
+        """attributesのキーの並びに対して、共有するキーのタプルを返す（最近使われたものだけを保持する）"""
+        return tuple(sys.intern(key) if isinstance(key, str) else key for key in keys)
+
+    @classmethod
+    def _intern_value(cls, value: Any) -> Any:
+        """短い文字列（リストの要素を含む）を共有する"""
+        if type(value) is str:
+            return sys.intern(value) if len(value) <= cls.INTERN_MAX_LENGTH else value
+        if type(value) is list:
+            return [sys.intern(item) if type(item) is str and len(item) <= cls.INTERN_MAX_LENGTH else item
+                    for item in value]
+        return value
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ExtractionRecord':
+        """
+        JSONから読み込んだ抽出データの辞書からレコードを作成する
+
+        Args:
+            data: 抽出データの辞書
+
+        Returns:
+            抽出データのレコード
+        """
+        return cls(data.get('extraction_class', _MISSING), data.get('extraction_text', _MISSING),
+                   data.get('attributes'))
+
+    @property
+    def attributes(self) -> Optional[Dict[str, Any]]:
+        """属性の辞書（参照のたびに作成する）"""
+        if self._attribute_keys is None:
+            return None
+        return dict(zip(self._attribute_keys, self._attribute_values))
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """
+        辞書のgetと同様に項目を参照する
+
+        Args:
+            name: 'extraction_class'、'extraction_text'、'attributes'のいずれか
+            default: 項目がない場合の値
+
+        Returns:
+            項目の値
+        """
+        if name == 'attributes':
+            attributes = self.attributes
+            return default if attributes is None else attributes
+        if name in ('extraction_class', 'extraction_text'):
+            value = getattr(self, name)
+            return default if value is _MISSING else value
+        return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """保持している項目を辞書に変換する"""
+        data = {}
+        for name in ('extraction_class', 'extraction_text', 'attributes'):
+            value = self.get(name, _MISSING)
+            if value is not _MISSING:
+                data[name] = value
+        return data
+
+
+def value_fingerprint(value: Any) -> Any:
+    """
+    属性値の同一性判定に使うハッシュ可能な指紋を返す
+    
+    辞書やリストなどハッシュできない値は、内容が等しければ同じ指紋になるよう正規化する。
+    指紋同士の等価性は元の値同士の == と一致する（辞書のキー順序は区別しない）。
+    
+    Args:
+        value: 属性値
+        
+    Returns:
+        ハッシュ可能な指紋
+    """
+    if isinstance(value, (str, int, float)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return ('__dict__', frozenset((k, value_fingerprint(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return ('__list__', tuple(value_fingerprint(v) for v in value))
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ('__repr__', repr(value))
+
+
+class NearDuplicateDetector:
+    """
+    テキストの近似重複判定
+
+    テキストを文字n-gram（シングル）の集合とみなし、集合のJaccard類似度で近似重複を判定する。
+    比較対象はグループの統合テキスト（最大MAX_TEXTS件）だけのため、登録済みのシングル集合と直接比較する。
+    """
+
+    def __init__(self, threshold: float, shingle_size: int = 3):
+        """
+        初期化
+
+        Args:
+            threshold: 近似重複とみなすJaccard類似度の下限（0〜1）
+            shingle_size: シングルの文字数
+        """
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+    def shingles(self, text: str) -> frozenset:
+        """テキストのシングル集合（大文字小文字・全角半角・空白の違いは無視する）"""
+        normalized = re.sub(r'\s+', '', unicodedata.normalize('NFKC', text).casefold())
+        size = self.shingle_size
+        return frozenset(normalized[i:i + size] for i in range(max(1, len(normalized) - size + 1)))
+
+    def new_index(self, texts: Iterable[str]) -> List[frozenset]:
+        """textsを登録したインデックス（シングル集合のリスト）を作成する"""
+        return [self.shingles(text) for text in texts]
+
+    def add(self, index: List[frozenset], text: str) -> bool:
+        """
+        近似重複でなければテキストをインデックスに登録する
+
+        近似重複と判定したテキストは保持しない（インデックスの大きさは登録したテキスト数のみに比例する）。
+
+        Args:
+            index: new_indexで作成したインデックス（更新される）
+            text: 判定するテキスト
+
+        Returns:
+            登録した場合はTrue、登録済みのテキストの近似重複の場合はFalse
+        """
+        shingles = self.shingles(text)
+        for other in index:
+            if len(shingles & other) >= self.threshold * len(shingles | other):
+                return False
+        index.append(shingles)
+        return True
+
+
+class KeyCanonicalizer:
+    """
+    統合キーの名前と値の表記ゆれを吸収する正規化
+
+    値: NFKC正規化（全角英数字の半角化など）、casefoldによる大文字小文字の統一、
+        法人格（株式会社、(株)、Inc.など）の除去、空白の除去の後、値の別名表で置き換える
+        （例: 'ＡＢＣ株式会社'、'ABC株式会社'、'abc 株式会社' はいずれも 'abc'）
+    キー: NFKC正規化、casefold、空白とハイフンのアンダースコアへの統一の後、キーの別名表で置き換える
+        （例: 'product name' と 'Product-Name' はいずれも 'product_name'）
+
+    正規化結果はlru_cacheで記憶するため、異なる文字列ごとに1回だけ計算する。
+    """
+
+    # 正規化の版数（正規化の結果が変わる変更を加えた場合に上げる）
+    VERSION = 1
+
+    # 正規化結果を記憶する文字列の最大数（キーと値それぞれ）
+    CACHE_SIZE = 1 << 18
+
+    # 値の先頭または末尾から除去する法人格（NFKC正規化・casefold後の表記）
+    JAPANESE_CORPORATE_SUFFIXES = ('株式会社', '(株)', '有限会社', '(有)', '合同会社', '合資会社', '合名会社')
+    # 英語の法人格は空白またはカンマの後にある場合のみ除去する（'TechCorp' などの語の一部は除去しない）
+    LATIN_CORPORATE_SUFFIXES = (r'co\.,?\s*ltd\.?', r'corporation', r'corp\.?', r'incorporated', r'inc\.?',
+                                r'ltd\.?', r'llc', r'gmbh', r'k\.k\.', r'co\.')
+
+    def __init__(self, key_aliases: Optional[Dict[str, str]] = None,
+                 value_aliases: Optional[Dict[str, str]] = None):
+        """
+        初期化
+
+        Args:
+            key_aliases: キーの別名表（別名 -> 正式名、どちらも正規化してから登録する）
+            value_aliases: 値の別名表（別名 -> 正式名、どちらも正規化してから登録する）
+        """
+        japanese = '|'.join(re.escape(suffix) for suffix in self.JAPANESE_CORPORATE_SUFFIXES)
+        latin = '|'.join(self.LATIN_CORPORATE_SUFFIXES)
+        self._prefix_pattern = re.compile(rf'^\s*(?:{japanese})\s*')
+        self._suffix_pattern = re.compile(rf'(?:\s*(?:{japanese})|[\s,]+(?:{latin}))\s*$')
+
+        self.key_aliases = {self._normalize_key(alias): self._normalize_key(name)
+                            for alias, name in (key_aliases or {}).items()}
+        self.value_aliases = {self._normalize_value(alias): self._normalize_value(name)
+                              for alias, name in (value_aliases or {}).items()}
+
+        # インスタンスごとに記憶する（別名表が異なるインスタンス間で結果を共有しない）
+        self.key = functools.lru_cache(maxsize=self.CACHE_SIZE)(self._canonical_key)
+        self.value = functools.lru_cache(maxsize=self.CACHE_SIZE)(self._canonical_value)
+
+    def _normalize_key(self, key: str) -> str:
+        """キーを正規化する（別名表は適用しない）"""
+        key = unicodedata.normalize('NFKC', str(key)).casefold().strip()
+        return re.sub(r'[\s\-]+', '_', key)
+
+    def _normalize_value(self, value: str) -> str:
+        """値を正規化する（別名表は適用しない）"""
+        normalized = unicodedata.normalize('NFKC', str(value)).casefold()
+        stripped = normalized
+        while True:
+            shortened = self._suffix_pattern.sub('', self._prefix_pattern.sub('', stripped))
+            if shortened == stripped:
+                break
+            stripped = shortened
+        # 法人格のみの値は除去せずに残す
+        return re.sub(r'\s+', '', stripped or normalized)
+
+    def _canonical_key(self, key: str) -> str:
+        normalized = self._normalize_key(key)
+        return self.key_aliases.get(normalized, normalized)
+
+    def _canonical_value(self, value: str) -> str:
+        normalized = self._normalize_value(value)
+        return self.value_aliases.get(normalized, normalized)
+
+    def fingerprint(self) -> Dict[str, Any]:
+        """正規化の設定を返す（統合設定の変更検知に使用）"""
+        return {
+            'version': self.VERSION,
+            'corporate_suffixes': [self._prefix_pattern.pattern, self._suffix_pattern.pattern],
+            'key_aliases': sorted(self.key_aliases.items()),
+            'value_aliases': sorted(self.value_aliases.items()),
+        }
+
+
+class KeyIndex:
+    """
+    統合キーの値からグループを引く転置インデックス
+
+    値ごとにノードを割り当て、同じ抽出データに現れた値同士をUnion-Find（素集合森）で
+    連結する。いずれかの値を共有するグループはほぼ線形時間で1つにまとめられる。
+    canonicalizeを指定した場合は、正規化後の値が等しい値を同じノードとして扱う。
+    グループのIDには、そのグループで最初に出現した値（正規化前の表記）を使用するため、
+    ハッシュのランダム化に依存せず結果が決定的になる。
+    """
+
+    def __init__(self, canonicalize=None):
+        """
+        初期化
+
+        Args:
+            canonicalize: 値を正規化する関数（Noneの場合は値をそのまま比較する）
+        """
+        self._canonicalize = canonicalize
+        self._nodes = {}     # 値（正規化後） -> ノード番号（出現順）
+        self._values = []    # ノード番号 -> 最初に出現した値
+        self._parent = []
+        self._size = []
+        self._first = []     # 根ノード -> 集合内で最初に出現したノード番号
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _node(self, value: str) -> int:
+        """値に対応するノード番号を返す（未登録なら追加する）"""
+        key = self._canonicalize(value) if self._canonicalize else value
+        node = self._nodes.get(key)
+        if node is None:
+            node = len(self._values)
+            self._nodes[key] = node
+            self._values.append(value)
+            self._parent.append(node)
+            self._size.append(1)
+            self._first.append(node)
+        return node
+
+    def _find(self, node: int) -> int:
+        """根ノードを返す（経路半減による圧縮付き）"""
+        parent = self._parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def _union(self, a: int, b: int) -> int:
+        """2つの集合を連結し、新しい根ノードを返す（サイズによる併合）"""
+        root_a = self._find(a)
+        root_b = self._find(b)
+        if root_a == root_b:
+            return root_a
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size[root_b]
+        self._first[root_a] = min(self._first[root_a], self._first[root_b])
+        return root_a
+
+    def add(self, values: Iterable[str]) -> None:
+        """
+        1件の抽出データに含まれる統合キーの値を登録し、互いに連結する
+
+        Args:
+            values: 統合キーの値
+        """
+        root = None
+        for value in values:
+            node = self._node(value)
+            root = node if root is None else self._union(root, node)
+
+    def group_key(self, value: str) -> str:
+        """
+        値が属するグループのIDを返す
+
+        Args:
+            value: 登録済みの統合キーの値
+
+        Returns:
+            グループ内で最初に出現した値
+        """
+        key = self._canonicalize(value) if self._canonicalize else value
+        return self._values[self._first[self._find(self._nodes[key])]]
+
+    def components(self) -> Dict[str, List[str]]:
+        """
+        連結された値の集合を返す
+
+        Returns:
+            グループのID -> グループに属する値（最初に出現した表記、出現順）の辞書
+        """
+        members = defaultdict(list)
+        for node, value in enumerate(self._values):
+            members[self._first[self._find(node)]].append(value)
+        return {self._values[first]: values for first, values in members.items()}
+
 
 class LangExtractIntegrator:
     """
     LangExtract出力JSONを統合するクラス
     """
     
+    # 数値データとして扱うattributesのキー
+    NUMERIC_KEYS = {'value', 'unit', 'context', 'year', 'target', 'size', 'rate', 'price', 'currency'}
+
+    # 統合テキストに含めるextraction_textの最大数
+    MAX_TEXTS = 3
+    
+    # 統合テキストの近似重複とみなす類似度（文字3-gramのJaccard類似度）の既定値。1以上の場合は完全一致のみ除く
+    NEAR_DUPLICATE_THRESHOLD = 0.8
+
     # 統合キーとして使用するattributesのキー
     # out配下の既存JSONを走査した結果、以下のキーが同義語として混在
     # - product_name / product name
     # - model_name   / model name
-    # 既存のキーは維持しつつ、スペース区切りの別名も受け付ける
+    # キーは正規化して比較するため、大文字小文字や空白・ハイフン区切りの違いも同じキーとして扱う
     INTEGRATION_KEYS = {
         # 製品・モデル名（表記ゆれ対応）
         'product_name', 'product name',
@@ -38,10 +451,64 @@ class LangExtractIntegrator:
         'target', 'market_type'
     }
     
-    def __init__(self):
-        """初期化"""
+    # 統合ロジックの版数（出力内容が変わる変更を加えた場合に上げる）
+    FORMAT_VERSION = 2
+    
+    # 統合キーの名前と値の別名表（別名 -> 正式名）。--aliasesで指定したファイルの内容を追加する
+    KEY_ALIASES: Dict[str, str] = {}
+    VALUE_ALIASES: Dict[str, str] = {}
+    
+    def __init__(self, aliases: Optional[Dict[str, Dict[str, str]]] = None,
+                 near_duplicate_threshold: Optional[float] = None):
+        """
+        初期化
+        
+        Args:
+            aliases: 追加の別名表（{'keys': {別名: 正式名}, 'values': {別名: 正式名}}）
+            near_duplicate_threshold: 統合テキストの近似重複とみなす類似度（Noneの場合は既定値）
+        """
         self.integrated_objects = []
         self.standalone_objects = []
+        self.standalone_count = 0
+        aliases = aliases or {}
+        self.canonicalizer = KeyCanonicalizer(
+            key_aliases={**self.KEY_ALIASES, **aliases.get('keys', {})},
+            value_aliases={**self.VALUE_ALIASES, **aliases.get('values', {})},
+        )
+        self._integration_keys = {self.canonicalizer.key(key) for key in self.INTEGRATION_KEYS}
+        if near_duplicate_threshold is None:
+            near_duplicate_threshold = self.NEAR_DUPLICATE_THRESHOLD
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.near_duplicates = (NearDuplicateDetector(near_duplicate_threshold)
+                                if near_duplicate_threshold < 1 else None)
+    
+    def is_integration_key(self, key: str) -> bool:
+        """
+        attributesのキーが統合キーかどうかを返す（正規化・別名の置き換え後に比較する）
+        
+        Args:
+            key: attributesのキー
+            
+        Returns:
+            統合キーの場合はTrue
+        """
+        return self.canonicalizer.key(key) in self._integration_keys
+    
+    def config_fingerprint(self) -> Dict[str, Any]:
+        """
+        出力内容に影響する統合設定を返す
+        
+        Returns:
+            統合設定の辞書（一括処理のマニフェストで変更検知に使用）
+        """
+        return {
+            'format_version': self.FORMAT_VERSION,
+            'integration_keys': sorted(self.INTEGRATION_KEYS),
+            'numeric_keys': sorted(self.NUMERIC_KEYS),
+            'max_texts': self.MAX_TEXTS,
+            'canonicalization': self.canonicalizer.fingerprint(),
+            'near_duplicate_threshold': self.near_duplicate_threshold if self.near_duplicates else None,
+        }
     
     def load_jsonl(self, file_path: str) -> List[Dict[str, Any]]:
         """
@@ -51,10 +518,21 @@ class LangExtractIntegrator:
             file_path: JSONLファイルのパス
             
         Returns:
-            抽出データのリスト
+            抽出データ（ExtractionRecord）のリスト
+        """
+        return list(self.iter_extractions(file_path))
+    
+    def iter_extractions(self, file_path: str, warn: bool = True) -> Iterator[Dict[str, Any]]:
         """
-        extractions = []
+        JSONLファイルから抽出データを1件ずつ読み込む
         
+        Args:
+            file_path: JSONLファイルのパス
+            warn: 不正な行の警告を表示するかどうか（同じファイルを再走査する場合はFalse）
+            
+        Yields:
+            抽出データ（ExtractionRecord）
+        """
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 for line_num, line in enumerate(f, 1):
@@ -63,13 +541,15 @@ class LangExtractIntegrator:
                         continue
                     
                     try:
-                        data = json.loads(line)
+                        data = json_codec.loads(line)
                         if 'extractions' in data:
-                            extractions.extend(data['extractions'])
-                        else:
+                            for extraction in data['extractions']:
+                                yield ExtractionRecord.from_dict(extraction)
+                        elif warn:
                             print(f"Warning: Line {line_num} does not contain 'extractions' key")
                     except json.JSONDecodeError as e:
-                        print(f"Error parsing line {line_num}: {e}")
+                        if warn:
+                            print(f"Error parsing line {line_num}: {e}")
                         continue
                         
         except FileNotFoundError:
@@ -78,10 +558,8 @@ class LangExtractIntegrator:
         except Exception as e:
             print(f"Error reading file {file_path}: {e}")
             sys.exit(1)
-            
-        return extractions
     
-    def extract_integration_keys(self, attributes: Dict[str, Any]) -> Set[str]:
+    def extract_integration_keys(self, attributes: Dict[str, Any]) -> List[str]:
         """
         attributesから統合キーの値を抽出する
         
@@ -89,23 +567,22 @@ class LangExtractIntegrator:
             attributes: オブジェクトのattributes辞書
             
         Returns:
-            統合キーの値のセット
+            統合キーの値のリスト（正規化後の値が等しいものは最初の表記のみ、attributes内の出現順）
         """
-        integration_values = set()
+        integration_values = {}   # 正規化後の値 -> 最初に出現した表記
+        canonical_value = self.canonicalizer.value
         
-        for key in self.INTEGRATION_KEYS:
-            if key in attributes:
-                value = attributes[key]
+        # 実行ごとに結果が変わらないよう、attributesの順序で走査する
+        for key, value in attributes.items():
+            if self.is_integration_key(key):
                 if value and value != "N/A":
                     # リストの場合は各要素を追加
-                    if isinstance(value, list):
-                        for item in value:
-                            if item and item != "N/A":
-                                integration_values.add(str(item))
-                    else:
-                        integration_values.add(str(value))
+                    for item in (value if isinstance(value, list) else (value,)):
+                        if item and item != "N/A":
+                            item = str(item)
+                            integration_values.setdefault(canonical_value(item), item)
         
-        return integration_values
+        return list(integration_values.values())
     
     def merge_attributes(self, attributes_list: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -118,42 +595,14 @@ class LangExtractIntegrator:
             マージされたattributes辞書
         """
         merged = {}
+        merged_index = {}
         
         # 数値データをタプル形式で収集
         numeric_tuples = self._extract_numeric_tuples(attributes_list)
         
         # 通常の属性をマージ
         for attrs in attributes_list:
-            for key, value in attrs.items():
-                if value == "N/A" or not value:
-                    continue
-                
-                # 数値関連のキーはスキップ（後で処理）
-                if key in {'value', 'unit', 'context', 'year', 'target', 'size', 'rate', 'price', 'currency'}:
-                    continue
-                
-                # 通常のマージ処理
-                if key not in merged:
-                    merged[key] = value
-                else:
-                    existing = merged[key]
-                    
-                    # 既存の値と同じ場合はスキップ
-                    if existing == value:
-                        continue
-                    
-                    # 異なる値の場合はリスト化
-                    if not isinstance(existing, list):
-                        merged[key] = [existing]
-                    
-                    # 新しい値を追加（重複を避ける）
-                    if isinstance(value, list):
-                        for item in value:
-                            if item not in merged[key]:
-                                merged[key].append(item)
-                    else:
-                        if value not in merged[key]:
-                            merged[key].append(value)
+            self._merge_attributes_into(merged, merged_index, attrs)
         
         # 数値データをタプル形式で追加
         if numeric_tuples:
@@ -161,6 +610,53 @@ class LangExtractIntegrator:
         
         return merged
     
+    def _merge_attributes_into(self, merged: Dict[str, Any], merged_index: Dict[str, Set[Any]],
+                               attrs: Dict[str, Any]) -> None:
+        """
+        1件分のattributesをマージ済み辞書に畳み込む
+        
+        リスト化した属性は、挿入順を保ったリストと値の指紋の集合を併せて持ち、
+        重複判定をハッシュで行う（値の数に対して線形時間）。
+        
+        Args:
+            merged: マージ済みattributes辞書（更新される）
+            merged_index: リスト化した属性の指紋の集合（更新される）
+            attrs: 追加するattributes
+        """
+        for key, value in attrs.items():
+            if value == "N/A" or not value:
+                continue
+            
+            # 数値関連のキーはスキップ（後で処理）
+            if key in self.NUMERIC_KEYS:
+                continue
+            
+            # 通常のマージ処理
+            if key not in merged:
+                # 入力のリストを書き換えないようコピーして保持
+                merged[key] = list(value) if isinstance(value, list) else value
+                continue
+            
+            existing = merged[key]
+            
+            if not isinstance(existing, list):
+                # 既存の値と同じ場合はスキップ
+                if existing == value:
+                    continue
+                # 異なる値の場合はリスト化
+                existing = merged[key] = [existing]
+            
+            seen = merged_index.get(key)
+            if seen is None:
+                seen = merged_index[key] = {value_fingerprint(item) for item in existing}
+            
+            # 新しい値を追加（重複を避ける）
+            for item in (value if isinstance(value, list) else (value,)):
+                fingerprint = value_fingerprint(item)
+                if fingerprint not in seen:
+                    seen.add(fingerprint)
+                    existing.append(item)
+    
     def _extract_numeric_tuples(self, attributes_list: List[Dict[str, Any]]) -> List[List[str]]:
         """
         数値データをタプル形式（[value, unit, context]）で抽出する
@@ -174,31 +670,44 @@ class LangExtractIntegrator:
         numeric_tuples = []
         
         for attrs in attributes_list:
-            # 数値関連のキーを持つオブジェクトをチェック
-            numeric_keys = {}
-            for key in {'value', 'unit', 'context', 'year', 'target', 'size', 'rate', 'price', 'currency'}:
-                if key in attrs and attrs[key] != "N/A" and attrs[key]:
-                    numeric_keys[key] = attrs[key]
-            
-            if numeric_keys:
-                # タプルを作成: [value, unit, context, year, target]
-                tuple_data = []
-                
-                # 優先順位に従って値を取得
-                tuple_data.append(numeric_keys.get('value', ''))
-                tuple_data.append(numeric_keys.get('unit', ''))
-                tuple_data.append(numeric_keys.get('context', ''))
-                tuple_data.append(numeric_keys.get('year', ''))
-                tuple_data.append(numeric_keys.get('target', ''))
-                
-                # 空でない値のみを保持
-                tuple_data = [str(v) for v in tuple_data if v and str(v).strip()]
-                
-                if tuple_data:
-                    numeric_tuples.append(tuple_data)
+            tuple_data = self._numeric_tuple(attrs)
+            if tuple_data:
+                numeric_tuples.append(tuple_data)
         
         return numeric_tuples
     
+    def _numeric_tuple(self, attrs: Dict[str, Any]) -> List[str]:
+        """
+        1件分のattributesから数値データのタプルを作成する
+        
+        Args:
+            attrs: 属性辞書
+            
+        Returns:
+            タプル形式の数値データ（数値関連のキーがない場合は空リスト）
+        """
+        # 数値関連のキーを持つオブジェクトをチェック
+        numeric_keys = {}
+        for key in self.NUMERIC_KEYS:
+            if key in attrs and attrs[key] != "N/A" and attrs[key]:
+                numeric_keys[key] = attrs[key]
+        
+        if not numeric_keys:
+            return []
+        
+        # タプルを作成: [value, unit, context, year, target]
+        tuple_data = []
+        
+        # 優先順位に従って値を取得
+        tuple_data.append(numeric_keys.get('value', ''))
+        tuple_data.append(numeric_keys.get('unit', ''))
+        tuple_data.append(numeric_keys.get('context', ''))
+        tuple_data.append(numeric_keys.get('year', ''))
+        tuple_data.append(numeric_keys.get('target', ''))
+        
+        # 空でない値のみを保持
+        return [str(v) for v in tuple_data if v and str(v).strip()]
+    
     def generate_summary(self, extractions: List[Dict[str, Any]]) -> str:
         """
         抽出データからsummaryを自動生成する
@@ -234,18 +743,21 @@ class LangExtractIntegrator:
             extractions: 抽出データのリスト
             
         Returns:
-            グループ化された抽出データの辞書
+            グループ化された抽出データの辞書（グループが最初に出現した順）
         """
-        groups = defaultdict(list)
-        
+        # 1パス目: 統合キーの値（正規化後）を共有する抽出データ同士を連結する
+        key_index = KeyIndex(self.canonicalizer.value)
+        primary_keys = []
         for extraction in extractions:
-            attributes = extraction.get('attributes', {})
-            integration_keys = self.extract_integration_keys(attributes)
-            
-            if integration_keys:
-                # 統合キーがある場合は、最初のキーでグループ化
-                primary_key = next(iter(integration_keys))
-                groups[primary_key].append(extraction)
+            integration_keys = self.extract_integration_keys(extraction.get('attributes', {}))
+            key_index.add(integration_keys)
+            primary_keys.append(integration_keys[0] if integration_keys else None)
+        
+        # 2パス目: 連結されたグループ単位に振り分ける
+        groups = defaultdict(list)
+        for extraction, primary_key in zip(extractions, primary_keys):
+            if primary_key is not None:
+                groups[key_index.group_key(primary_key)].append(extraction)
             else:
                 # 統合キーがない場合は個別オブジェクトとして扱う
                 self.standalone_objects.append(extraction)
@@ -263,26 +775,95 @@ class LangExtractIntegrator:
         Returns:
             統合されたオブジェクト
         """
-        # classesの収集
-        classes = list(set(ext.get('extraction_class', '') for ext in extractions))
-        classes = [cls for cls in classes if cls]  # 空文字列を除外
+        state = GroupState()
+        for ext in extractions:
+            self.fold_extraction(state, ext)
+        return self.finalize_group(group_key, state)
+    
+    def fold_extraction(self, state: GroupState, extraction: Dict[str, Any]) -> None:
+        """
+        抽出データ1件をグループの途中状態に畳み込む
+        
+        Args:
+            state: グループの途中状態（更新される）
+            extraction: 追加する抽出データ
+        """
+        # classesの収集（出現順を保持）
+        state.classes[extraction.get('extraction_class', '')] = None
         
         # attributesのマージ
-        attributes_list = [ext.get('attributes', {}) for ext in extractions]
-        merged_attributes = self.merge_attributes(attributes_list)
+        attributes = extraction.get('attributes', {})
+        self._merge_attributes_into(state.merged, state.merged_index, attributes)
+        tuple_data = self._numeric_tuple(attributes)
+        if tuple_data:
+            state.numeric_tuples.append(tuple_data)
         
-        # 統合されたテキストを作成（重複を避けて）
-        unique_texts = []
-        seen_texts = set()
+        # 統合テキストの候補を収集（重複と近似重複を避けて、最大MAX_TEXTS件まで）
+        if len(state.texts) < self.MAX_TEXTS:
+            text = extraction.get('extraction_text', '').strip()
+            if text and text not in state.texts and not self._is_near_duplicate(state, text):
+                state.texts.append(text)
+    
+    def merge_group_state(self, state: GroupState, other: GroupState) -> None:
+        """
+        別に畳み込んだ途中状態をグループの途中状態にマージする
         
-        for ext in extractions:
-            text = ext.get('extraction_text', '').strip()
-            if text and text not in seen_texts:
-                unique_texts.append(text)
-                seen_texts.add(text)
+        classes、attributes、数値データはotherの抽出データを順にfold_extractionした場合と同じ結果になる。
+        統合テキストはotherで選ばれた候補（最大MAX_TEXTS件）から重複と近似重複を除いて追加する。
         
-        # 統合されたテキストを結合（最大3つまで）
-        combined_text = " | ".join(unique_texts[:3])
+        Args:
+            state: グループの途中状態（更新される）
+            other: マージする途中状態
+        """
+        for cls in other.classes:
+            state.classes[cls] = None
+        self._merge_attributes_into(state.merged, state.merged_index, other.merged)
+        state.numeric_tuples.extend(other.numeric_tuples)
+        for text in other.texts:
+            if len(state.texts) >= self.MAX_TEXTS:
+                break
+            if text not in state.texts and not self._is_near_duplicate(state, text):
+                state.texts.append(text)
+    
+    def _is_near_duplicate(self, state: GroupState, text: str) -> bool:
+        """
+        テキストが収集済みの統合テキストの近似重複かどうかを判定する
+        
+        近似重複でない場合は、以降の判定のためにインデックスに登録する。
+        インデックスは2件目の候補が現れた時点で作成するため、1件だけのグループではシングル集合を計算しない。
+        
+        Args:
+            state: グループの途中状態（インデックスが更新される）
+            text: 判定するテキスト
+            
+        Returns:
+            近似重複の場合はTrue
+        """
+        if self.near_duplicates is None or not state.texts:
+            return False
+        if state.text_index is None:
+            state.text_index = self.near_duplicates.new_index(state.texts)
+        return not self.near_duplicates.add(state.text_index, text)
+    
+    def finalize_group(self, group_key: str, state: GroupState) -> Dict[str, Any]:
+        """
+        グループの途中状態から統合オブジェクトを作成する
+        
+        Args:
+            group_key: グループのキー
+            state: グループの途中状態
+            
+        Returns:
+            統合されたオブジェクト
+        """
+        classes = [cls for cls in state.classes if cls]  # 空文字列を除外
+        
+        merged_attributes = dict(state.merged)
+        if state.numeric_tuples:
+            merged_attributes['numeric_data'] = list(state.numeric_tuples)
+        
+        # 統合されたテキストを結合
+        combined_text = " | ".join(state.texts)
         
         # ベクトルDB化に適した簡潔な形式
         result = {
@@ -322,34 +903,177 @@ class LangExtractIntegrator:
             integrated_objects.append(integrated_obj)
         
         # 個別オブジェクトも統合データ形式に変換
-        for standalone in self.standalone_objects:
-            standalone_obj = self.integrate_group(
-                f"standalone_{len(self.integrated_objects)}", 
-                [standalone]
-            )
-            integrated_objects.append(standalone_obj)
+        integrated_objects.extend(self.integrate_standalone_objects())
         
         self.integrated_objects = integrated_objects
         return integrated_objects
     
-    def save_json(self, output_file: str, data: List[Dict[str, Any]]) -> None:
+    def integrate_standalone_objects(self) -> List[Dict[str, Any]]:
+        """
+        group_extractionsで分けた個別オブジェクトを統合データ形式に変換する
+        
+        Returns:
+            統合オブジェクトのリスト（IDは standalone_0, standalone_1, ... の通し番号）
+        """
+        return [self.integrate_group(f"standalone_{index}", [standalone])
+                for index, standalone in enumerate(self.standalone_objects)]
+    
+    def process_file_streaming(self, input_file: str) -> Iterator[Dict[str, Any]]:
+        """
+        JSONLファイルをストリーミング処理して統合データを作成する
+        
+        抽出データを1件ずつ読み込み、グループの途中状態に畳み込むため、
+        メモリ使用量は抽出データ数ではなくグループ数（統合キーの値の種類数）に比例する。
+        グループの確定と統合のため、入力ファイルを2回走査する。
+        個別オブジェクトは一時ファイルに退避し、グループの後に順次返す。
+        出力内容はprocess_fileと同一。
+        
+        Args:
+            input_file: 入力ファイルのパス
+            
+        Returns:
+            統合されたオブジェクトのイテレータ（グループ、個別オブジェクトの順）
+        """
+        print(f"Processing file: {input_file}")
+        
+        # 1パス目: 統合キーの値だけを読み込んでグループを確定する
+        key_index = KeyIndex(self.canonicalizer.value)
+        for extraction in self.iter_extractions(input_file):
+            key_index.add(self.extract_integration_keys(extraction.get('attributes', {})))
+        
+        # 2パス目: 抽出データを確定したグループの途中状態に畳み込む
+        groups = {}
+        extraction_count = 0
+        self.standalone_count = 0
+        spill = tempfile.TemporaryFile('w+', encoding='utf-8')
+        
+        try:
+            for extraction in self.iter_extractions(input_file, warn=False):
+                extraction_count += 1
+                attributes = extraction.get('attributes', {})
+                integration_keys = self.extract_integration_keys(attributes)
+                
+                if integration_keys:
+                    group_key = key_index.group_key(integration_keys[0])
+                    state = groups.get(group_key)
+                    if state is None:
+                        state = groups[group_key] = GroupState()
+                    self.fold_extraction(state, extraction)
+                else:
+                    # 統合キーがない場合は個別オブジェクトとして一時ファイルに退避
+                    standalone_obj = self.integrate_group(
+                        f"standalone_{self.standalone_count}",
+                        [extraction]
+                    )
+                    spill.write(json_codec.dumps(standalone_obj, separators=(',', ':')) + '\n')
+                    self.standalone_count += 1
+        except BaseException:
+            spill.close()
+            raise
+        
+        print(f"Loaded {extraction_count} extractions")
+        print(f"Created {len(groups)} groups")
+        print(f"Found {self.standalone_count} standalone objects")
+        
+        # 各グループを統合（途中状態は統合後すぐに解放する）
+        group_objects = []
+        for group_key in list(groups):
+            group_objects.append(self.finalize_group(group_key, groups.pop(group_key)))
+        
+        self.integrated_objects = group_objects
+        return itertools.chain(group_objects, self._iter_spilled_objects(spill))
+    
+    def _iter_spilled_objects(self, spill) -> Iterator[Dict[str, Any]]:
+        """
+        一時ファイルに退避した統合オブジェクトを順次読み出す
+        
+        Args:
+            spill: 退避先の一時ファイル
+            
+        Yields:
+            統合されたオブジェクト
+        """
+        with spill:
+            spill.seek(0)
+            for line in spill:
+                yield json_codec.loads(line)
+    
+    def save_json(self, output_file: str, data: Iterable[Dict[str, Any]]) -> None:
         """
         統合データをJSONファイルに保存する
         
+        データは1件ずつ書き出すため、イテレータを渡した場合も全件をメモリに保持しない。
+        出力はjson.dump(data, ensure_ascii=False, indent=2)と同一。
+        
         Args:
             output_file: 出力ファイルのパス
             data: 保存するデータ
         """
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            print(f"Saved {len(data)} integrated objects to {output_file}")
+            count = 0
+            with atomic_output(output_file) as tmp_file, open(tmp_file, 'w', encoding='utf-8') as f:
+                for obj in data:
+                    f.write('[\n  ' if count == 0 else ',\n  ')
+                    # 要素ごとのインデントを1段深くする（JSON文字列中に改行は現れない）
+                    f.write(json_codec.dumps(obj, indent=2).replace('\n', '\n  '))
+                    count += 1
+                f.write('\n]' if count else '[]')
+            print(f"Saved {count} integrated objects to {output_file}")
         except Exception as e:
             print(f"Error saving file {output_file}: {e}")
             sys.exit(1)
+    
+    def save_jsonl(self, output_file: str, data: Iterable[Dict[str, Any]]) -> None:
+        """
+        統合データをJSONL形式（1行1オブジェクト、インデントなし）で保存する
+        
+        統合オブジェクトは作成された順に1行ずつ書き出す。
+        
+        Args:
+            output_file: 出力ファイルのパス
+            data: 保存するデータ
+        """
+        try:
+            count = 0
+            with atomic_output(output_file) as tmp_file, open(tmp_file, 'w', encoding='utf-8') as f:
+                for obj in data:
+                    f.write(json_codec.dumps(obj, separators=(',', ':')))
+                    f.write('\n')
+                    count += 1
+            print(f"Saved {count} integrated objects to {output_file}")
+        except Exception as e:
+            print(f"Error saving file {output_file}: {e}")
+            sys.exit(1)
+
 
+# 出力形式ごとの出力ファイル名の接尾辞
+OUTPUT_SUFFIXES = {
+    'json': '_integrated.json',
+    'jsonl': '_integrated.jsonl',
+}
 
-def process_single_file(input_file: str, output_file: str, verbose: bool = False) -> bool:
+# text_analyzer_report.pyの絞り込み結果の接尾辞（元の *_results.jsonl の一部のため一括処理では除く）
+FILTERED_RESULTS_SUFFIX = '_filtered_results.jsonl'
+
+
+def default_output_file(input_path: Path, output_format: str = 'json') -> Path:
+    """
+    入力ファイルに対応する既定の出力ファイルのパスを返す
+    
+    Args:
+        input_path: 入力ファイルのパス
+        output_format: 出力形式（'json'または'jsonl'）
+        
+    Returns:
+        元ファイル名に_integratedを追記し、出力形式の拡張子にしたパス（元ファイルと同じディレクトリ）
+    """
+    return input_path.parent / (input_path.with_suffix('').name + OUTPUT_SUFFIXES[output_format])
+
+
+def process_single_file(input_file: str, output_file: str, verbose: bool = False,
+                        streaming: bool = False, output_format: str = 'json',
+                        aliases: Optional[Dict[str, Dict[str, str]]] = None,
+                        near_duplicate_threshold: Optional[float] = None) -> bool:
     """
     単一ファイルを処理する
     
@@ -357,42 +1081,60 @@ def process_single_file(input_file: str, output_file: str, verbose: bool = False
         input_file: 入力ファイルのパス
         output_file: 出力ファイルのパス
         verbose: 詳細情報を表示するかどうか
+        streaming: ストリーミングモードで処理するかどうか
+        output_format: 出力形式（'json'または'jsonl'）
+        aliases: 統合キーの名前と値の別名表（load_aliasesの結果）
+        near_duplicate_threshold: 統合テキストの近似重複とみなす類似度（Noneの場合は既定値）
         
     Returns:
         処理が成功したかどうか
     """
-    integrator = LangExtractIntegrator()
+    integrator = LangExtractIntegrator(aliases, near_duplicate_threshold)
     
     try:
-        integrated_data = integrator.process_file(input_file)
+        if streaming:
+            integrated_data = integrator.process_file_streaming(input_file)
+            # ストリーミング時はグループのみがメモリ上にあり、個別オブジェクトは件数のみ把握している
+            group_objects = integrator.integrated_objects
+            standalone_count = integrator.standalone_count
+        else:
+            integrated_data = integrator.process_file(input_file)
+            group_objects = integrated_data
+            standalone_count = len(integrator.standalone_objects)
         
         if verbose:
+            total_count = len(group_objects) + (standalone_count if streaming else 0)
             print(f"\nIntegration Summary for {Path(input_file).name}:")
-            print(f"- Total integrated objects: {len(integrated_data)}")
-            print(f"- Objects with integration keys: {len(integrated_data) - len(integrator.standalone_objects)}")
-            print(f"- Standalone objects: {len(integrator.standalone_objects)}")
+            print(f"- Total integrated objects: {total_count}")
+            print(f"- Objects with integration keys: {total_count - standalone_count}")
+            print(f"- Standalone objects: {standalone_count}")
             
             # 統合キーの使用状況を表示
             key_usage = defaultdict(int)
-            for obj in integrated_data:
+            for obj in group_objects:
                 if obj['id'].startswith('standalone_'):
                     key_usage['standalone'] += 1
                 else:
-                    # 統合キーの種類を推定
+                    # 統合キーの種類を推定（attributesの順序で最初に見つかったキー）
                     attrs = obj['attributes']
-                    for key in integrator.INTEGRATION_KEYS:
-                        if key in attrs:
+                    for key in attrs:
+                        if integrator.is_integration_key(key):
                             key_usage[key] += 1
                             break
                     else:
                         key_usage['other'] += 1
+            if streaming and standalone_count:
+                key_usage['standalone'] += standalone_count
             
             print(f"\nIntegration Key Usage:")
             for key, count in key_usage.items():
                 print(f"  {key}: {count}")
         
         # 結果の保存
-        integrator.save_json(str(output_file), integrated_data)
+        if output_format == 'jsonl':
+            integrator.save_jsonl(str(output_file), integrated_data)
+        else:
+            integrator.save_json(str(output_file), integrated_data)
         return True
         
     except Exception as e:
@@ -403,6 +1145,457 @@ def process_single_file(input_file: str, output_file: str, verbose: bool = False
         return False
 
 
+def load_aliases(aliases_file: str) -> Dict[str, Dict[str, str]]:
+    """
+    統合キーの別名表をJSONファイルから読み込む
+    
+    ファイルの形式: {"keys": {"製品名": "product_name"}, "values": {"ホームコネクト": "HomeConnect"}}
+    
+    Args:
+        aliases_file: 別名表のJSONファイルのパス
+        
+    Returns:
+        'keys'と'values'の別名表の辞書
+    """
+    with open(aliases_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {
+        'keys': {str(alias): str(name) for alias, name in data.get('keys', {}).items()},
+        'values': {str(alias): str(name) for alias, name in data.get('values', {}).items()},
+    }
+
+
+# 一括処理のマニフェストファイル名（outディレクトリ内に作成）
+MANIFEST_NAME = '.integration_manifest.json'
+
+
+def file_sha256(file_path: str) -> str:
+    """
+    ファイル内容のSHA-256ハッシュを計算する
+    
+    Args:
+        file_path: ファイルのパス
+        
+    Returns:
+        16進数のハッシュ文字列
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IntegrationManifest:
+    """
+    一括処理のマニフェスト
+    
+    入力ファイルごとに入力のハッシュ、統合設定のハッシュ、出力ファイルのハッシュを記録し、
+    前回の実行から入力も設定も変わっていないファイルの再処理を省略する。
+    ファイル全体を書き直すため、一括処理中はSAVE_INTERVAL秒ごとと終了時にだけ保存する。
+    """
+    
+    VERSION = 1
+    
+    # 一括処理中にマニフェストを保存する間隔（秒）
+    SAVE_INTERVAL = 30.0
+    
+    def __init__(self, path: Path):
+        """
+        初期化
+        
+        Args:
+            path: マニフェストファイルのパス
+        """
+        self.path = Path(path)
+        self.entries = {}
+        # 保存していない記録があるかどうかと、最後に保存した時刻
+        self.dirty = False
+        self._saved_at = time.monotonic()
+        self.load()
+    
+    def load(self) -> None:
+        """マニフェストを読み込む（存在しない・壊れている場合は空として扱う）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable manifest {self.path}: {e}")
+            return
+        
+        if data.get('version') == self.VERSION:
+            self.entries = data.get('files', {})
+    
+    def save(self) -> None:
+        """マニフェストを保存する"""
+        with atomic_output(self.path) as tmp_file, open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'files': self.entries},
+                      f, ensure_ascii=False, indent=2, sort_keys=True)
+        self.dirty = False
+        self._saved_at = time.monotonic()
+    
+    def save_if_due(self) -> None:
+        """保存していない記録があり、前回の保存からSAVE_INTERVAL秒以上経過している場合に保存する"""
+        if self.dirty and time.monotonic() - self._saved_at >= self.SAVE_INTERVAL:
+            self.save()
+    
+    @staticmethod
+    def is_up_to_date(entry: Optional[Dict[str, str]], input_hash: str, config_hash: str,
+                      output_file: Path) -> bool:
+        """
+        前回の処理結果がそのまま使えるかどうかを判定する
+        
+        Args:
+            entry: 前回の処理結果の記録（記録がない場合はNone）
+            input_hash: 入力ファイルの現在のハッシュ
+            config_hash: 統合設定の現在のハッシュ
+            output_file: 出力ファイルのパス
+            
+        Returns:
+            入力・設定・出力のいずれも前回から変わっていなければTrue
+        """
+        if not entry:
+            return False
+        if entry.get('input_sha256') != input_hash or entry.get('config_sha256') != config_hash:
+            return False
+        if entry.get('output') != output_file.name or not output_file.exists():
+            return False
+        return file_sha256(str(output_file)) == entry.get('output_sha256')
+    
+    def record(self, input_name: str, entry: Dict[str, str]) -> None:
+        """
+        処理結果を記録する
+        
+        Args:
+            input_name: 入力ファイル名
+            entry: 記録する内容
+        """
+        self.entries[input_name] = entry
+        self.dirty = True
+
+
+def config_sha256(config: Dict[str, Any]) -> str:
+    """
+    統合設定のハッシュを計算する
+    
+    Args:
+        config: LangExtractIntegrator.config_fingerprint()の結果
+        
+    Returns:
+        16進数のハッシュ文字列
+    """
+    canonical = json.dumps(config, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _run_batch_task(task: Dict[str, Any]) -> tuple:
+    """
+    一括処理の1ファイル分を処理する
+    
+    マニフェストの記録と入力ファイル・統合設定が一致し、出力ファイルも変更されていなければ処理を省略する。
+    
+    Args:
+        task: 処理内容の辞書（input_file, output_file, verbose, streaming, output_format,
+              aliases, near_duplicate_threshold, config_hash, previous_entry, force）
+        
+    Returns:
+        (状態, マニフェストに記録する内容)のタプル。状態は'success', 'skipped', 'failed'のいずれか
+    """
+    input_file = task['input_file']
+    output_file = task['output_file']
+    input_hash = file_sha256(input_file)
+    
+    if not task['force'] and IntegrationManifest.is_up_to_date(
+            task['previous_entry'], input_hash, task['config_hash'], Path(output_file)):
+        return 'skipped', task['previous_entry']
+    
+    if not process_single_file(input_file, output_file, task['verbose'],
+                               streaming=task['streaming'], output_format=task['output_format'],
+                               aliases=task['aliases'],
+                               near_duplicate_threshold=task['near_duplicate_threshold']):
+        return 'failed', None
+    
+    entry = {
+        'input_sha256': input_hash,
+        'config_sha256': task['config_hash'],
+        'output': Path(output_file).name,
+        'output_sha256': file_sha256(output_file),
+    }
+    return 'success', entry
+
+
+def _process_batch_file(task: Dict[str, Any]) -> tuple:
+    """
+    一括処理の1ファイル分をワーカープロセスで処理する
+    
+    ファイルごとのログをまとめて表示できるよう、標準出力と標準エラー出力を捕捉して返す。
+    
+    Args:
+        task: _run_batch_taskに渡す処理内容の辞書
+        
+    Returns:
+        (状態, マニフェストに記録する内容, 標準出力の内容, 標準エラー出力の内容)のタプル
+    """
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            status, entry = _run_batch_task(task)
+        except SystemExit:
+            # 読み込みエラー時のsys.exitは当該ファイルの失敗として扱う
+            status, entry = 'failed', None
+        except Exception as e:
+            print(f"Error during processing {task['input_file']}: {e}")
+            status, entry = 'failed', None
+    
+    return status, entry, stdout.getvalue(), stderr.getvalue()
+
+
+# コーパス統合の既定の出力ファイル名（outディレクトリ内に作成）
+CORPUS_OUTPUT_NAME = 'corpus'
+
+
+def _iter_pickled(path: str) -> Iterator[Any]:
+    """pickle.dumpで連続して書き込んだレコードを順に読み出す"""
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _map_corpus_file(task: Dict[str, Any]) -> tuple:
+    """
+    コーパス統合のmapフェーズ: 1ファイル分の抽出データをグループの途中状態に畳み込む
+    
+    グループごとに('group', グループのID, 途中状態)を、個別オブジェクトごとに('standalone', 統合オブジェクト)を
+    task['map_file']にpickleで書き出す。グループの統合キーの値は、ファイル間の連結のため親プロセスに返す。
+    
+    Args:
+        task: 処理内容の辞書（input_file, map_file, aliases, near_duplicate_threshold）
+        
+    Returns:
+        (成功したかどうか, グループのID -> 統合キーの値のリストの辞書, 抽出データ数, 標準出力の内容)のタプル
+    """
+    stdout = io.StringIO()
+    components = {}
+    extraction_count = 0
+    ok = True
+    
+    with contextlib.redirect_stdout(stdout):
+        try:
+            integrator = LangExtractIntegrator(task['aliases'], task['near_duplicate_threshold'])
+            input_file = task['input_file']
+            
+            # 1パス目: ファイル内でグループを確定する
+            key_index = KeyIndex(integrator.canonicalizer.value)
+            for extraction in integrator.iter_extractions(input_file):
+                key_index.add(integrator.extract_integration_keys(extraction.get('attributes', {})))
+            
+            # 2パス目: グループの途中状態に畳み込む（個別オブジェクトはそのまま書き出す）
+            groups = {}
+            with open(task['map_file'], 'wb') as f:
+                for extraction in integrator.iter_extractions(input_file, warn=False):
+                    extraction_count += 1
+                    integration_keys = integrator.extract_integration_keys(extraction.get('attributes', {}))
+                    if integration_keys:
+                        group_key = key_index.group_key(integration_keys[0])
+                        state = groups.get(group_key)
+                        if state is None:
+                            state = groups[group_key] = GroupState()
+                        integrator.fold_extraction(state, extraction)
+                    else:
+                        standalone_obj = integrator.integrate_group('standalone', [extraction])
+                        pickle.dump(('standalone', standalone_obj), f, pickle.HIGHEST_PROTOCOL)
+                
+                all_components = key_index.components()
+                for group_key, state in groups.items():
+                    # 指紋の集合と近似重複判定のインデックスはreduceフェーズで必要になった時点で作り直す
+                    state.merged_index = {}
+                    state.text_index = None
+                    pickle.dump(('group', group_key, state), f, pickle.HIGHEST_PROTOCOL)
+                    components[group_key] = all_components[group_key]
+            print(f"Mapped {extraction_count} extractions into {len(groups)} groups: {input_file}")
+        except SystemExit:
+            # 読み込みエラー時のsys.exitは当該ファイルの失敗として扱う
+            ok = False
+        except Exception as e:
+            print(f"Error during processing {task['input_file']}: {e}")
+            ok = False
+    
+    return ok, components, extraction_count, stdout.getvalue()
+
+
+def _reduce_corpus_shard(task: Dict[str, Any]) -> int:
+    """
+    コーパス統合のreduceフェーズ: 1シャード分のグループの途中状態をマージして統合する
+    
+    シャードのファイルには(出現順, グループのID, 途中状態)が書き込まれている。
+    統合オブジェクトは出現順に[出現順, 統合オブジェクト]の形式でtask['output_file']にJSONLで書き出す。
+    メモリ使用量はこのシャードに属するグループ数に比例する。
+    
+    Args:
+        task: 処理内容の辞書（shard_file, output_file, aliases, near_duplicate_threshold）
+        
+    Returns:
+        統合したグループ数
+    """
+    integrator = LangExtractIntegrator(task['aliases'], task['near_duplicate_threshold'])
+    groups = {}
+    for order, group_key, partial in _iter_pickled(task['shard_file']):
+        entry = groups.get(group_key)
+        if entry is None:
+            groups[group_key] = (order, partial)
+        else:
+            integrator.merge_group_state(entry[1], partial)
+    
+    with open(task['output_file'], 'w', encoding='utf-8') as f:
+        for group_key, (order, state) in sorted(groups.items(), key=lambda item: item[1][0]):
+            obj = integrator.finalize_group(group_key, state)
+            f.write(json_codec.dumps([order, obj], separators=(',', ':')) + '\n')
+    return len(groups)
+
+
+def _iter_reduced_objects(path: str) -> Iterator[tuple]:
+    """reduceフェーズの出力を(出現順, 統合オブジェクト)の順に読み出す"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            order, obj = json_codec.loads(line)
+            yield order, obj
+
+
+def integrate_corpus(input_files: List[str], output_file: str, output_format: str = 'json',
+                     jobs: int = 1, shards: int = 0,
+                     aliases: Optional[Dict[str, Dict[str, str]]] = None,
+                     near_duplicate_threshold: Optional[float] = None) -> bool:
+    """
+    複数の入力ファイルをまとめて1つのコーパスに統合する
+    
+    1. map: ファイルごとに（並列に）グループの途中状態を作成し、一時ファイルに書き出す
+    2. 全ファイルのグループの統合キーの値をUnion-Findで連結し、ファイルをまたいだグループを確定する
+    3. グループのIDのハッシュでシャードに振り分け、途中状態をシャードごとの一時ファイルに移す
+    4. reduce: シャードごとに（並列に）途中状態をマージして統合オブジェクトを作成する
+    5. シャードの出力を出現順にマージし、個別オブジェクトを続けて保存する
+    
+    同じ統合キーの値（正規化後）を持つグループは、ファイルが異なっても1つに統合される。
+    入力ファイルを順に連結したファイルを統合した場合と同じになるのは、グループのIDとグループの構成のみで、
+    classesの順序、リスト化した属性とnumeric_dataの要素の順序、統合テキストはマージ順により異なることがある。
+    個別オブジェクトのIDはコーパス内で一意になるよう standalone_0, standalone_1, ... と振り直す。
+    
+    Args:
+        input_files: 入力JSONLファイルのパスのリスト（この順序で連結したものとして扱う）
+        output_file: 出力ファイルのパス
+        output_format: 出力形式（'json'または'jsonl'）
+        jobs: mapとreduceで並列に処理するプロセス数
+        shards: reduceフェーズのシャード数（0の場合はjobsと同じ）
+        aliases: 統合キーの名前と値の別名表（load_aliasesの結果）
+        near_duplicate_threshold: 統合テキストの近似重複とみなす類似度（Noneの場合は既定値）
+        
+    Returns:
+        処理が成功したかどうか
+    """
+    shards = shards if shards > 0 else jobs
+    integrator = LangExtractIntegrator(aliases, near_duplicate_threshold)
+    
+    with tempfile.TemporaryDirectory(prefix='corpus_integration_') as work_dir:
+        map_tasks = [{
+            'input_file': str(input_file),
+            'map_file': os.path.join(work_dir, f'map_{index}.pkl'),
+            'aliases': aliases,
+            'near_duplicate_threshold': near_duplicate_threshold,
+        } for index, input_file in enumerate(input_files)]
+        
+        # map: ファイルごとにグループの途中状態を作成する
+        print(f"Mapping {len(map_tasks)} files with {jobs} processes")
+        if jobs > 1 and len(map_tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(map_tasks))) as executor:
+                map_results = list(executor.map(_map_corpus_file, map_tasks))
+        else:
+            map_results = [_map_corpus_file(task) for task in map_tasks]
+        
+        failed = False
+        for task, (ok, _, _, stdout) in zip(map_tasks, map_results):
+            sys.stdout.write(stdout)
+            if not ok:
+                print(f"✗ Failed to process: {Path(task['input_file']).name}")
+                failed = True
+        if failed:
+            return False
+        extraction_count = sum(result[2] for result in map_results)
+        
+        # ファイルをまたいで統合キーの値を連結する（ファイル順、ファイル内のグループの出現順）
+        key_index = KeyIndex(integrator.canonicalizer.value)
+        for _, components, _, _ in map_results:
+            for values in components.values():
+                key_index.add(values)
+        
+        # 途中状態をグループのIDのハッシュでシャードに振り分ける（出現順はグループが最初に現れた位置）
+        group_order = {}
+        shard_files = [os.path.join(work_dir, f'shard_{shard}.pkl') for shard in range(shards)]
+        standalone_file = os.path.join(work_dir, 'standalone.jsonl')
+        standalone_count = 0
+        shard_handles = [open(path, 'wb') for path in shard_files]
+        try:
+            with open(standalone_file, 'w', encoding='utf-8') as standalone_out:
+                for task in map_tasks:
+                    for record in _iter_pickled(task['map_file']):
+                        if record[0] == 'standalone':
+                            standalone_out.write(json_codec.dumps(record[1], separators=(',', ':')) + '\n')
+                            standalone_count += 1
+                            continue
+                        _, local_key, state = record
+                        group_key = key_index.group_key(local_key)
+                        order = group_order.setdefault(group_key, len(group_order))
+                        shard = zlib.crc32(group_key.encode('utf-8')) % shards
+                        pickle.dump((order, group_key, state), shard_handles[shard], pickle.HIGHEST_PROTOCOL)
+                    os.unlink(task['map_file'])
+        finally:
+            for handle in shard_handles:
+                handle.close()
+        group_count = len(group_order)
+        del group_order, key_index
+        
+        print(f"Loaded {extraction_count} extractions")
+        print(f"Created {group_count} groups across {len(input_files)} files")
+        print(f"Found {standalone_count} standalone objects")
+        
+        # reduce: シャードごとに途中状態をマージする
+        reduce_tasks = [{
+            'shard_file': shard_file,
+            'output_file': os.path.join(work_dir, f'reduced_{shard}.jsonl'),
+            'aliases': aliases,
+            'near_duplicate_threshold': near_duplicate_threshold,
+        } for shard, shard_file in enumerate(shard_files)]
+        print(f"Reducing {shards} shards with {jobs} processes")
+        if jobs > 1 and shards > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, shards)) as executor:
+                list(executor.map(_reduce_corpus_shard, reduce_tasks))
+        else:
+            for task in reduce_tasks:
+                _reduce_corpus_shard(task)
+        
+        def iter_corpus():
+            merged = heapq.merge(*(_iter_reduced_objects(task['output_file']) for task in reduce_tasks),
+                                 key=lambda item: item[0])
+            for _, obj in merged:
+                yield obj
+            with open(standalone_file, 'r', encoding='utf-8') as f:
+                for index, line in enumerate(f):
+                    obj = json_codec.loads(line)
+                    obj['id'] = f"standalone_{index}"
+                    yield obj
+        
+        if output_format == 'jsonl':
+            integrator.save_jsonl(str(output_file), iter_corpus())
+        else:
+            integrator.save_json(str(output_file), iter_corpus())
+    return True
+
+
 def main():
     """メイン関数"""
     parser = argparse.ArgumentParser(
@@ -415,15 +1608,73 @@ def main():
     )
     parser.add_argument(
         '-o', '--output', 
-        help='出力JSONファイルのパス (単一ファイル処理時のみ有効、指定しない場合は元ファイル名に_integratedを追記)'
+        help='出力JSONファイルのパス (単一ファイル処理時と--corpus指定時のみ有効、指定しない場合は元ファイル名に_integratedを追記)'
     )
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
         help='詳細な処理情報を表示する'
     )
+    parser.add_argument(
+        '--format',
+        choices=sorted(OUTPUT_SUFFIXES),
+        default='json',
+        dest='output_format',
+        help='出力形式（json: インデント付きの1つのJSON配列、jsonl: 1行1オブジェクトの圧縮形式、既定値: json）'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='抽出データを逐次読み込んで統合する（メモリ使用量を抽出データ数ではなくグループ数に比例させる）'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='一括処理時に並列に処理するプロセス数（0の場合はCPUコア数、既定値: 1）'
+    )
+    parser.add_argument(
+        '--aliases',
+        metavar='FILE',
+        help='統合キーの名前と値の別名表（JSON: {"keys": {別名: 正式名}, "values": {別名: 正式名}}）'
+    )
+    parser.add_argument(
+        '--near-duplicate-threshold',
+        type=float,
+        default=LangExtractIntegrator.NEAR_DUPLICATE_THRESHOLD,
+        help='統合テキストから近似重複として除くextraction_textの類似度'
+             f'（0〜1、1以上の場合は完全一致のみ除く、既定値: {LangExtractIntegrator.NEAR_DUPLICATE_THRESHOLD}）'
+    )
+    parser.add_argument(
+        '--corpus',
+        action='store_true',
+        help='一括処理時に、outディレクトリ内の全ファイルを1つのコーパスとして統合する'
+             '（ファイルをまたいで同じ統合キーの値を持つオブジェクトを統合し、out/corpus_integrated.jsonに保存）'
+    )
+    parser.add_argument(
+        '--shards',
+        type=int,
+        default=0,
+        help='--corpus指定時に、統合キーのハッシュでグループを分割して統合するシャード数'
+             '（シャードごとのメモリ使用量はそのシャードのグループ数に比例、0の場合は--jobsと同じ、既定値: 0）'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='一括処理時に、入力と設定が前回から変わっていないファイルも含めてすべて再処理する'
+    )
     
     args = parser.parse_args()
+    if args.corpus and args.input_file:
+        parser.error('--corpus cannot be used with input_file')
+    
+    aliases = None
+    if args.aliases:
+        try:
+            aliases = load_aliases(args.aliases)
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Error: Failed to load aliases file {args.aliases}: {e}")
+            sys.exit(1)
     
     # 単一ファイル処理の場合
     if args.input_file:
@@ -436,12 +1687,13 @@ def main():
         if args.output:
             output_file = args.output
         else:
-            # 元ファイル名に_integratedを追記し、拡張子を.jsonに変更
-            output_file = input_path.with_suffix('').name + '_integrated.json'
-            # 元ファイルと同じディレクトリに出力
-            output_file = input_path.parent / output_file
+            # 元ファイル名に_integratedを追記し、元ファイルと同じディレクトリに出力
+            output_file = default_output_file(input_path, args.output_format)
         
-        success = process_single_file(str(input_path), str(output_file), args.verbose)
+        success = process_single_file(str(input_path), str(output_file), args.verbose,
+                                      streaming=args.stream, output_format=args.output_format,
+                                      aliases=aliases,
+                                      near_duplicate_threshold=args.near_duplicate_threshold)
         if not success:
             sys.exit(1)
     
@@ -452,32 +1704,102 @@ def main():
             print("Error: 'out' directory does not exist")
             sys.exit(1)
         
-        # outディレクトリ内のJSONLファイルを検索
-        jsonl_files = list(out_dir.glob("*.jsonl"))
+        # outディレクトリ内のJSONLファイルを検索（JSONL形式の統合結果と絞り込み結果は除く）
+        jsonl_files = [
+            path for path in out_dir.glob("*.jsonl")
+            if not path.name.endswith((OUTPUT_SUFFIXES['jsonl'], FILTERED_RESULTS_SUFFIX))
+        ]
         if not jsonl_files:
             print("No .jsonl files found in 'out' directory")
             sys.exit(1)
         
         print(f"Found {len(jsonl_files)} JSONL files in 'out' directory")
         
+        jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+        
+        if args.corpus:
+            # ファイル名順に連結したものとして1つのコーパスに統合する
+            output_file = args.output or default_output_file(out_dir / f"{CORPUS_OUTPUT_NAME}.jsonl",
+                                                             args.output_format)
+            success = integrate_corpus(sorted(str(path) for path in jsonl_files), str(output_file),
+                                       output_format=args.output_format, jobs=jobs, shards=args.shards,
+                                       aliases=aliases,
+                                       near_duplicate_threshold=args.near_duplicate_threshold)
+            if not success:
+                sys.exit(1)
+            return
+        
         success_count = 0
         total_count = len(jsonl_files)
         
+        # マニフェストと現在の統合設定（入力・設定に変更がないファイルは再処理しない）
+        manifest = IntegrationManifest(out_dir / MANIFEST_NAME)
+        config_hash = config_sha256(
+            LangExtractIntegrator(aliases, args.near_duplicate_threshold).config_fingerprint())
+        
+        tasks = []
         for jsonl_file in jsonl_files:
+            # 出力ファイル名を決定
+            output_file = default_output_file(jsonl_file, args.output_format)
+            tasks.append({
+                'input_file': str(jsonl_file),
+                'output_file': str(output_file),
+                'verbose': args.verbose,
+                'streaming': args.stream,
+                'output_format': args.output_format,
+                'aliases': aliases,
+                'near_duplicate_threshold': args.near_duplicate_threshold,
+                'config_hash': config_hash,
+                'previous_entry': manifest.entries.get(jsonl_file.name),
+                'force': args.force,
+            })
+        
+        skipped_count = 0
+        
+        def print_header(task):
             print(f"\n{'='*60}")
-            print(f"Processing: {jsonl_file.name}")
+            print(f"Processing: {Path(task['input_file']).name}")
             print(f"{'='*60}")
-            
-            # 出力ファイル名を決定
-            output_file = jsonl_file.with_suffix('').name + '_integrated.json'
-            output_file = jsonl_file.parent / output_file
-            
-            success = process_single_file(str(jsonl_file), str(output_file), args.verbose)
-            if success:
-                success_count += 1
+        
+        def record_result(task, status, entry):
+            nonlocal success_count, skipped_count
+            jsonl_file = Path(task['input_file'])
+            output_file = Path(task['output_file'])
+            if status == 'failed':
+                print(f"✗ Failed to process: {jsonl_file.name}")
+                return
+            success_count += 1
+            if status == 'skipped':
+                skipped_count += 1
+                print(f"✓ Up to date, skipped: {output_file.name}")
+            else:
                 print(f"✓ Successfully processed: {output_file.name}")
+            manifest.record(jsonl_file.name, entry)
+            manifest.save_if_due()
+        
+        # マニフェストは途中で中断された場合も含めて、一括処理の最後に保存する
+        try:
+            if jobs > 1 and total_count > 1:
+                # プロセスプールで並列処理し、ファイルごとのログを入力順にまとめて表示
+                with ProcessPoolExecutor(max_workers=min(jobs, total_count)) as executor:
+                    results = executor.map(_process_batch_file, tasks)
+                    for task, (status, entry, stdout, stderr) in zip(tasks, results):
+                        print_header(task)
+                        sys.stdout.write(stdout)
+                        if stderr:
+                            sys.stderr.write(stderr)
+                        record_result(task, status, entry)
             else:
-                print(f"✗ Failed to process: {jsonl_file.name}")
+                for task in tasks:
+                    print_header(task)
+                    status, entry = _run_batch_task(task)
+                    record_result(task, status, entry)
+        finally:
+            if manifest.dirty:
+                manifest.save()
+        
+        if skipped_count:
+            print(f"\nSkipped {skipped_count} unchanged files (use --force to rebuild)")
         
         print(f"\n{'='*60}")
         print(f"Batch processing completed: {success_count}/{total_count} files processed successfully")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽出パイプラインの処理時間と件数の計測
+
+文書ごとに段階（examplesの選択、LLM呼び出し、結果の保存、可視化など）別の処理時間、
+入出力の文字数、抽出件数、エラー数を記録し、JSONファイルまたは
+Prometheusのtextfile形式（node exporterのtextfile collectorで収集できる形式）で出力します。
+
+計測しているのはtext_analyzer_report.py（--metrics、--metrics-prom）の抽出処理だけです。
+text_analyzer_bugtickets.pyとjson_integration.pyは計測していません。
+プロンプトは固定の文字列のため、プロンプト作成の段階はありません（example_selectionは
+入力に近いexamplesを選ぶ時間で、LLM呼び出しの時間はllmに含まれます）。
+"""
+
+import contextlib
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from extraction_journal import atomic_output
+
+
+# Prometheusのメトリクス名の接頭辞
+METRIC_PREFIX = "langextract_pipeline"
+
+
+def _write_text(path: Path, content: str) -> None:
+    """計測結果をファイルに保存する（一時ファイル経由）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_output(path) as tmp_file:
+        tmp_file.write_text(content, encoding='utf-8')
+
+
+class DocumentMetrics:
+    """
+    1文書の計測値
+
+    stage()は複数スレッドから同時に使用できる（チャンクを並列に抽出する場合は各チャンクの時間を合計する）。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stage_seconds: Dict[str, float] = defaultdict(float)
+        self.chars_in = 0
+        self.chars_out = 0
+        self.extractions = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """withブロックの処理時間を段階nameの時間に加算する"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stage_seconds[name] += elapsed
+
+    def record_result(self, annotated_document: Any) -> None:
+        """抽出結果の件数と抽出されたテキストの文字数を記録する"""
+        extractions = getattr(annotated_document, 'extractions', None) or []
+        self.extractions = len(extractions)
+        self.chars_out = sum(len(extraction.extraction_text or '') for extraction in extractions)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'stage_seconds': dict(self.stage_seconds),
+            'chars_in': self.chars_in,
+            'chars_out': self.chars_out,
+            'extractions': self.extractions,
+            'errors': self.errors,
+        }
+
+
+class PipelineMetrics:
+    """複数文書の計測値の集計"""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._documents: Dict[str, DocumentMetrics] = {}
+        self._lock = threading.Lock()
+
+    def document(self, name: str) -> DocumentMetrics:
+        """文書nameの計測値を返す（初めての場合は作成する）"""
+        with self._lock:
+            metrics = self._documents.get(name)
+            if metrics is None:
+                metrics = self._documents[name] = DocumentMetrics(name)
+            return metrics
+
+    @property
+    def documents(self) -> List[DocumentMetrics]:
+        with self._lock:
+            return list(self._documents.values())
+
+    def aggregate(self) -> Dict[str, Any]:
+        """全文書の合計値を計算する"""
+        documents = self.documents
+        stage_seconds: Dict[str, float] = defaultdict(float)
+        stage_max: Dict[str, float] = defaultdict(float)
+        for document in documents:
+            for stage, seconds in document.stage_seconds.items():
+                stage_seconds[stage] += seconds
+                stage_max[stage] = max(stage_max[stage], seconds)
+        return {
+            'documents': len(documents),
+            'failed_documents': sum(1 for document in documents if document.errors),
+            'wall_seconds': time.perf_counter() - self._start,
+            'stage_seconds': dict(stage_seconds),
+            'stage_max_seconds': dict(stage_max),
+            'chars_in': sum(document.chars_in for document in documents),
+            'chars_out': sum(document.chars_out for document in documents),
+            'extractions': sum(document.extractions for document in documents),
+            'errors': sum(document.errors for document in documents),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'started_at': self.started_at.isoformat(),
+            'aggregate': self.aggregate(),
+            'documents': [document.to_dict() for document in self.documents],
+        }
+
+    def write_json(self, path: Path) -> None:
+        """文書ごとと全体の計測値をJSONファイルに保存する"""
+        _write_text(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2) + "\n")
+
+    def to_prometheus(self) -> str:
+        """全体の計測値をPrometheusのテキスト形式に変換する"""
+        aggregate = self.aggregate()
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            full_name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{full_name}{{{label_text}}} {value}" if label_text else f"{full_name} {value}")
+
+        metric("stage_seconds_total", "counter", "Time spent in each pipeline stage, summed over documents.",
+               [({'stage': stage}, seconds) for stage, seconds in sorted(aggregate['stage_seconds'].items())])
+        metric("stage_max_seconds", "gauge", "Longest time spent in each pipeline stage by a single document.",
+               [({'stage': stage}, seconds) for stage, seconds in sorted(aggregate['stage_max_seconds'].items())])
+        metric("documents_total", "counter", "Documents processed.", [({}, aggregate['documents'])])
+        metric("failed_documents_total", "counter", "Documents with at least one error.",
+               [({}, aggregate['failed_documents'])])
+        metric("errors_total", "counter", "Errors raised while processing documents.", [({}, aggregate['errors'])])
+        metric("extractions_total", "counter", "Extractions produced.", [({}, aggregate['extractions'])])
+        metric("characters_in_total", "counter", "Characters of input text.", [({}, aggregate['chars_in'])])
+        metric("characters_out_total", "counter", "Characters of extracted text.", [({}, aggregate['chars_out'])])
+        metric("wall_seconds", "gauge", "Wall-clock duration of the run.", [({}, aggregate['wall_seconds'])])
+        metric("last_run_timestamp_seconds", "gauge", "Unix time at which the run started.",
+               [({}, self.started_at.timestamp())])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path) -> None:
+        """全体の計測値をPrometheusのtextfile形式（*.prom）で保存する"""
+        _write_text(path, self.to_prometheus())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽出結果（*_results.jsonl）の検索
+
+抽出結果ファイルごとに、クラス名・属性名・属性値から該当する抽出結果の位置
+（行の先頭のバイト位置と行内の抽出結果の番号）を引く索引をサイドカーファイル
+（*_results.jsonl.idx）として保存します。
+同じファイルを繰り返し検索する場合は索引から該当する行だけを読むため、ファイル全体を解析し直しません。
+抽出結果ファイルが更新された場合は、索引を自動的に作り直します。
+"""
+
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import json_codec
+from extraction_journal import atomic_output
+
+
+INDEX_SUFFIX = ".idx"
+
+# 索引の形式の版数（形式を変える場合に上げる）
+INDEX_VERSION = 1
+
+# 属性名と属性値を1つの索引キーにまとめる際の区切り文字
+_VALUE_SEPARATOR = "\x00"
+
+# (行の先頭のバイト位置, 行内の抽出結果の番号)
+Posting = Tuple[int, int]
+
+
+def index_path(result_file: Path) -> Path:
+    """抽出結果ファイルに対応する索引ファイルのパスを返す"""
+    result_file = Path(result_file)
+    return result_file.with_name(result_file.name + INDEX_SUFFIX)
+
+
+def _attribute_values(value: Any) -> Iterator[str]:
+    """属性値を索引に登録する文字列に変換する（リストは要素ごとに登録する）"""
+    if isinstance(value, list):
+        for item in value:
+            yield from _attribute_values(item)
+    elif isinstance(value, dict) or value is None:
+        return
+    else:
+        yield str(value)
+
+
+def _source_signature(result_file: Path) -> Dict[str, int]:
+    """索引が最新かどうかの判定に使う抽出結果ファイルのサイズと更新日時"""
+    stat = result_file.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class ResultsIndex:
+    """
+    1つの抽出結果ファイルの索引
+
+    classes: クラス名 → 位置のリスト
+    attributes: 属性名 → 位置のリスト
+    values: 属性名と属性値 → 位置のリスト
+    """
+
+    def __init__(self, source: Dict[str, int]):
+        self.source = source
+        self.classes: Dict[str, List[Posting]] = defaultdict(list)
+        self.attributes: Dict[str, List[Posting]] = defaultdict(list)
+        self.values: Dict[str, List[Posting]] = defaultdict(list)
+
+    @classmethod
+    def build(cls, result_file: Path) -> 'ResultsIndex':
+        """
+        抽出結果ファイル全体を1回読んで索引を作成する
+
+        Args:
+            result_file: *_results.jsonl のパス
+
+        Returns:
+            作成した索引
+        """
+        index = cls(_source_signature(result_file))
+        with open(result_file, 'rb') as f:
+            offset = 0
+            for line in f:
+                line_offset = offset
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    document = json_codec.loads(line)
+                except ValueError:
+                    continue
+                for position, extraction in enumerate(document.get('extractions') or []):
+                    index.add(extraction, (line_offset, position))
+        return index
+
+    def add(self, extraction: Dict[str, Any], posting: Posting) -> None:
+        """抽出結果1件を索引に登録する"""
+        class_name = extraction.get('extraction_class')
+        if class_name is not None:
+            self.classes[class_name].append(posting)
+        for name, value in (extraction.get('attributes') or {}).items():
+            self.attributes[name].append(posting)
+            for text in set(_attribute_values(value)):
+                self.values[name + _VALUE_SEPARATOR + text].append(posting)
+
+    def lookup(self, class_name: Optional[str] = None, attribute_name: Optional[str] = None,
+               attribute_value: Optional[str] = None) -> List[Posting]:
+        """
+        すべての条件に一致する抽出結果の位置を返す
+
+        Args:
+            class_name: クラス名（Noneの場合は条件にしない）
+            attribute_name: 属性名（Noneの場合は条件にしない）
+            attribute_value: 属性値（attribute_nameの属性の値、Noneの場合は条件にしない）
+
+        Returns:
+            ファイル内の順に並べた位置のリスト
+        """
+        candidates: List[Iterable[Posting]] = []
+        if class_name is not None:
+            candidates.append(self.classes.get(class_name, ()))
+        if attribute_name is not None:
+            if attribute_value is not None:
+                key = attribute_name + _VALUE_SEPARATOR + str(attribute_value)
+                candidates.append(self.values.get(key, ()))
+            else:
+                candidates.append(self.attributes.get(attribute_name, ()))
+        if not candidates:
+            return []
+
+        # 件数の少ない条件から絞り込む
+        candidates.sort(key=len)
+        matches: Set[Posting] = set(candidates[0])
+        for postings in candidates[1:]:
+            matches.intersection_update(postings)
+        return sorted(matches)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': INDEX_VERSION,
+            'source': self.source,
+            'classes': self.classes,
+            'attributes': self.attributes,
+            'values': self.values,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ResultsIndex':
+        index = cls(data['source'])
+        for name in ('classes', 'attributes', 'values'):
+            table = getattr(index, name)
+            for key, postings in data[name].items():
+                table[key] = [tuple(posting) for posting in postings]
+        return index
+
+    def save(self, path: Path) -> None:
+        """索引を保存する（一時ファイル経由）"""
+        with atomic_output(path) as tmp_file, open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+
+
+def load_index(result_file: Path) -> ResultsIndex:
+    """
+    抽出結果ファイルの索引を読み込む
+
+    索引ファイルがない場合や、抽出結果ファイルが索引の作成後に更新された場合は作り直して保存する。
+
+    Args:
+        result_file: *_results.jsonl のパス
+
+    Returns:
+        最新の索引
+    """
+    result_file = Path(result_file)
+    path = index_path(result_file)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == INDEX_VERSION and data.get('source') == _source_signature(result_file):
+            return ResultsIndex.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    index = ResultsIndex.build(result_file)
+    try:
+        index.save(path)
+    except OSError as e:
+        print(f"Warning: Failed to save index {path}: {e}")
+    return index
+
+
+def filter_results(result_file: Path, class_name: Optional[str] = None,
+                   attribute_name: Optional[str] = None,
+                   attribute_value: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    抽出結果ファイルから条件に一致する抽出結果を取り出す
+
+    索引で該当する行の位置を求め、その行だけを読んで解析する。
+
+    Args:
+        result_file: *_results.jsonl のパス
+        class_name: クラス名（Noneの場合は条件にしない）
+        attribute_name: 属性名（Noneの場合は条件にしない）
+        attribute_value: attribute_nameの属性の値（リストの場合はいずれかの要素と一致すればよい）
+
+    Returns:
+        一致した抽出結果（ファイル内の順）のリスト
+    """
+    postings = load_index(result_file).lookup(class_name, attribute_name, attribute_value)
+    if not postings:
+        return []
+
+    positions_by_offset: Dict[int, List[int]] = defaultdict(list)
+    for offset, position in postings:
+        positions_by_offset[offset].append(position)
+
+    filtered = []
+    with open(result_file, 'rb') as f:
+        for offset in sorted(positions_by_offset):
+            f.seek(offset)
+            extractions = json_codec.loads(f.readline()).get('extractions') or []
+            filtered.extend(extractions[position] for position in positions_by_offset[offset])
+    return filtered
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown文書の見出し単位での分割と並列抽出
+
+長いレポートを見出し（#〜######）ごとのセクションに分割し、セクションごとに並列で抽出した結果を
+元の文書の文字位置に戻して1つのAnnotatedDocumentにまとめます。
+上限サイズを超えるセクションは、段落、行、文字数の順に分割します。
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Tuple
+
+import langextract as lx
+
+
+# Markdownの見出し行（行頭の#1〜6個と空白）
+HEADING_PATTERN = re.compile(r'^#{1,6}[ \t]', re.MULTILINE)
+
+# セクション内の分割位置の候補（優先順）: 段落の区切り、行の区切り
+_FALLBACK_SEPARATORS = ('\n\n', '\n')
+
+
+def _split_at_headings(text: str) -> List[Tuple[int, int]]:
+    """見出し行の位置で文書を分割し、(開始位置, 終了位置)のリストを返す"""
+    starts = [match.start() for match in HEADING_PATTERN.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    ends = starts[1:] + [len(text)]
+    return [(start, end) for start, end in zip(starts, ends) if end > start]
+
+
+def _split_oversized(text: str, start: int, end: int, max_chars: int) -> List[Tuple[int, int]]:
+    """上限を超える範囲を、段落・行・文字数の順に上限以下の範囲へ分割する"""
+    spans = []
+    while end - start > max_chars:
+        limit = start + max_chars
+        cut = -1
+        for separator in _FALLBACK_SEPARATORS:
+            position = text.rfind(separator, start + 1, limit)
+            if position != -1:
+                cut = position + len(separator)
+                break
+        if cut <= start:
+            cut = limit
+        spans.append((start, cut))
+        start = cut
+    spans.append((start, end))
+    return spans
+
+
+def split_sections(text: str, max_chars: int) -> List[Tuple[int, str]]:
+    """
+    文書を見出し単位のチャンクに分割する
+
+    隣接する短いセクションは、合計がmax_charsを超えない範囲で1つのチャンクにまとめる。
+    チャンクをつなげると元の文書と完全に一致する。
+
+    Args:
+        text: 分割する文書
+        max_chars: 1チャンクの最大文字数
+
+    Returns:
+        (元の文書での開始位置, チャンクのテキスト)のリスト
+    """
+    spans = []
+    for start, end in _split_at_headings(text):
+        spans.extend(_split_oversized(text, start, end, max_chars))
+
+    merged = []
+    for start, end in spans:
+        if merged and end - merged[-1][0] <= max_chars:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    return [(start, text[start:end]) for start, end in merged]
+
+
+def shift_extractions(extractions: List[Any], offset: int) -> List[Any]:
+    """
+    チャンク内の文字位置を元の文書の文字位置に変換する
+
+    Args:
+        extractions: チャンクに対する抽出結果（更新される）
+        offset: チャンクの元の文書での開始位置
+
+    Returns:
+        変換後の抽出結果
+    """
+    for extraction in extractions:
+        interval = extraction.char_interval
+        if interval is not None:
+            if interval.start_pos is not None:
+                interval.start_pos += offset
+            if interval.end_pos is not None:
+                interval.end_pos += offset
+        # トークン位置はチャンク単位のため元の文書では意味を持たない
+        extraction.token_interval = None
+    return extractions
+
+
+def extract_by_sections(text: str, extract_chunk: Callable[[str], Any], max_chars: int,
+                        max_workers: int = 4) -> Any:
+    """
+    文書をセクションに分割して並列に抽出し、結果を1つの文書にまとめる
+
+    Args:
+        text: 抽出対象の文書
+        extract_chunk: チャンクのテキストを受け取りAnnotatedDocumentを返す関数
+        max_chars: 1チャンクの最大文字数
+        max_workers: 同時に抽出するチャンク数
+
+    Returns:
+        元の文書の文字位置を持つAnnotatedDocument
+    """
+    chunks = split_sections(text, max_chars)
+    if len(chunks) == 1:
+        return extract_chunk(text)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        results = list(executor.map(lambda chunk: extract_chunk(chunk[1]), chunks))
+
+    extractions = []
+    for (offset, _), result in zip(chunks, results):
+        extractions.extend(shift_extractions(result.extractions or [], offset))
+    for index, extraction in enumerate(extractions, 1):
+        extraction.extraction_index = index
+
+    return lx.data.AnnotatedDocument(text=text, extractions=extractions)
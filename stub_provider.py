@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク用のスタブLLMプロバイダー
+
+GeminiやOllamaを呼び出さずに抽出処理全体を実行するためのLangExtractのプロバイダーです。
+プロンプトの末尾の入力文書から語句を取り出して定型の抽出結果（JSON）を返し、
+LLMの応答時間は指定した遅延とゆらぎで模擬します。
+model_idが"stub"で始まる場合にこのプロバイダーが選ばれます（モジュールのimport時に登録）。
+
+抽出スクリプトでは環境変数LLM_PROVIDER=stub（または--stubオプション）で選択し、
+応答時間は環境変数STUB_LLM_LATENCYとSTUB_LLM_JITTER（秒）で指定します。
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Iterator, List, Optional, Sequence
+
+import langextract as lx
+from langextract.core import base_model
+from langextract.core import types as core_types
+
+
+# このプロバイダーを選択するmodel_id
+STUB_MODEL_ID = "stub-extractor"
+
+# 抽出スクリプトのget_model_configでスタブを選択する環境変数の値
+STUB_PROVIDER_NAME = "stub"
+
+# 抽出する語句（英数字の連続、カタカナの連続、漢字の連続）
+_TERM_PATTERN = re.compile(r'[A-Za-z][A-Za-z0-9\-]+|[ァ-ヶー]{2,}|[一-龥]{2,}')
+
+# LangExtractのプロンプトで入力文書の前に置かれる接頭辞
+_QUESTION_PREFIX = "Q: "
+_ANSWER_PREFIX = "\nA:"
+
+
+def _question_text(prompt: str) -> str:
+    """プロンプトの最後の質問（入力文書）を取り出す"""
+    start = prompt.rfind(_QUESTION_PREFIX)
+    if start == -1:
+        return prompt
+    start += len(_QUESTION_PREFIX)
+    end = prompt.rfind(_ANSWER_PREFIX, start)
+    return prompt[start:end if end != -1 else len(prompt)]
+
+
+@lx.providers.router.register(r'^stub', priority=10)
+class StubLanguageModel(base_model.BaseLanguageModel):
+    """
+    定型の抽出結果を返すLLMプロバイダー
+
+    入力文書に含まれる語句を先頭からmax_extractions件まで抽出結果として返すため、
+    抽出結果の文字位置の対応付けなどLLM以外の処理は実際と同様に実行される。
+    """
+
+    def __init__(self, model_id: str = STUB_MODEL_ID, latency: float = 0.0, jitter: float = 0.0,
+                 max_extractions: int = 5, extraction_classes: Sequence[str] = ('name', 'product'),
+                 seed: Optional[int] = None, **kwargs: Any):
+        """
+        初期化
+
+        Args:
+            model_id: モデルID（"stub"で始まる文字列）
+            latency: 1プロンプトあたりの応答時間（秒）
+            jitter: 応答時間のゆらぎの幅（秒、latency±jitterの一様分布）
+            max_extractions: 1プロンプトあたりの最大抽出件数
+            extraction_classes: 抽出結果に順に割り当てるクラス名
+            seed: 応答時間のゆらぎの乱数シード
+        """
+        # LangExtractが全プロバイダーに渡す引数（api_key、temperatureなど）は使用しない
+        for key in ('api_key', 'format_type', 'temperature', 'model_url', 'base_url', 'max_workers'):
+            kwargs.pop(key, None)
+        super().__init__(**kwargs)
+        self.model_id = model_id
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.max_extractions = int(max_extractions)
+        self.extraction_classes = list(extraction_classes) or ['name']
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sleep(self) -> None:
+        """LLMの応答時間を模擬して待機する"""
+        with self._lock:
+            delay = self.latency + self._rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _respond(self, prompt: str) -> str:
+        """入力文書の語句から抽出結果のJSONを作成する"""
+        extractions: List[dict] = []
+        seen = set()
+        for match in _TERM_PATTERN.finditer(_question_text(prompt)):
+            term = match.group()
+            if term in seen:
+                continue
+            seen.add(term)
+            extraction_class = self.extraction_classes[len(extractions) % len(self.extraction_classes)]
+            extractions.append({
+                extraction_class: term,
+                f"{extraction_class}_attributes": {'product_name': term},
+            })
+            if len(extractions) >= self.max_extractions:
+                break
+        content = json.dumps({'extractions': extractions}, ensure_ascii=False, indent=2)
+        return f"```json\n{content}\n```"
+
+    def infer(self, batch_prompts: Sequence[str], **kwargs) -> Iterator[Sequence[core_types.ScoredOutput]]:
+        """
+        プロンプトごとに定型の抽出結果を返す
+
+        Args:
+            batch_prompts: プロンプトのリスト
+
+        Yields:
+            プロンプトごとのScoredOutputのリスト
+        """
+        for prompt in batch_prompts:
+            self._sleep()
+            yield [core_types.ScoredOutput(score=1.0, output=self._respond(prompt))]
+
+
+def use_stub_provider() -> bool:
+    """環境変数LLM_PROVIDERでスタブが選択されていればTrue"""
+    return os.getenv('LLM_PROVIDER') == STUB_PROVIDER_NAME
+
+
+def stub_model_config() -> dict:
+    """
+    スタブを使用するlx.extractのモデル設定を返す
+
+    Returns:
+        model_id、api_key、language_model_params（応答時間の設定）の辞書
+    """
+    return {
+        'model_id': STUB_MODEL_ID,
+        'api_key': None,
+        'language_model_params': {
+            'latency': float(os.getenv('STUB_LLM_LATENCY', '0.5')),
+            'jitter': float(os.getenv('STUB_LLM_JITTER', '0.1')),
+        },
+    }
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""テスト共通の設定（リポジトリ直下のモジュールをインポートできるようにする）"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""benchmark_integration.py のテスト"""
+
+import json_codec
+from benchmark_integration import run_benchmark
+
+
+def test_in_memory_and_streaming_outputs_match(tmp_path):
+    in_memory = run_benchmark(3000, seed=1, streaming=False, work_dir=str(tmp_path))
+    streaming = run_benchmark(3000, seed=1, streaming=True, work_dir=str(tmp_path))
+
+    assert in_memory['standalone_objects'] > 1
+    assert in_memory['output_sha256'] == streaming['output_sha256']
+
+
+def test_codecs_produce_same_output(tmp_path):
+    try:
+        hashes = {run_benchmark(3000, seed=2, work_dir=str(tmp_path), codec=codec)['output_sha256']
+                  for codec in json_codec.AVAILABLE_BACKENDS}
+    finally:
+        json_codec.set_backend(None)
+
+    assert len(hashes) == 1
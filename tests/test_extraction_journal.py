@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""extraction_journal.py と抽出スクリプトの--resumeのテスト"""
+
+import json
+import sys
+
+import langextract as lx
+import pytest
+
+import text_analyzer_bugtickets
+from extraction_journal import (ExtractionJournal, atomic_output, save_annotated_document, text_sha256,
+                                STATUS_STARTED, STATUS_DONE, STATUS_FAILED)
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return tmp_path / 'out' / '.test_journal.log'
+
+
+@pytest.fixture
+def output_file(tmp_path):
+    path = tmp_path / 'out' / 'doc_results.jsonl'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text('{}\n', encoding='utf-8')
+    return path
+
+
+def test_done_with_same_input_and_outputs_is_completed(journal_path, output_file):
+    journal = ExtractionJournal(journal_path)
+    journal.record('doc.md', 'hash1', STATUS_STARTED)
+    journal.record('doc.md', 'hash1', STATUS_DONE, [output_file])
+
+    assert journal.is_completed('doc.md', 'hash1')
+    assert ExtractionJournal(journal_path).is_completed('doc.md', 'hash1')
+
+
+@pytest.mark.parametrize('status', [STATUS_STARTED, STATUS_FAILED])
+def test_interrupted_or_failed_is_not_completed(journal_path, output_file, status):
+    journal = ExtractionJournal(journal_path)
+    journal.record('doc.md', 'hash1', STATUS_DONE, [output_file])
+    # 後の記録が優先される（完了後に再処理して中断・失敗した場合）
+    journal.record('doc.md', 'hash1', status, error='error' if status == STATUS_FAILED else None)
+
+    assert not ExtractionJournal(journal_path).is_completed('doc.md', 'hash1')
+
+
+def test_changed_input_or_missing_output_is_not_completed(journal_path, output_file):
+    journal = ExtractionJournal(journal_path)
+    journal.record('doc.md', 'hash1', STATUS_DONE, [output_file])
+
+    assert not journal.is_completed('doc.md', 'hash2')
+    assert not journal.is_completed('other.md', 'hash1')
+    output_file.unlink()
+    assert not journal.is_completed('doc.md', 'hash1')
+
+
+def test_torn_last_line_is_ignored(journal_path, output_file):
+    ExtractionJournal(journal_path).record('doc.md', 'hash1', STATUS_DONE, [output_file])
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"version": 1, "document": "doc.md", "sta')
+
+    journal = ExtractionJournal(journal_path)
+    assert journal.is_completed('doc.md', 'hash1')
+
+    # 書きかけの行の後に追記した記録も失われない
+    journal.record('next.md', 'hash2', STATUS_DONE, [output_file])
+    assert ExtractionJournal(journal_path).is_completed('next.md', 'hash2')
+    lines = journal_path.read_text(encoding='utf-8').splitlines()
+    assert json.loads(lines[-1])['document'] == 'next.md'
+
+
+def test_atomic_output_keeps_previous_file_on_error(tmp_path):
+    path = tmp_path / 'doc_results.jsonl'
+    path.write_text('old\n', encoding='utf-8')
+
+    with pytest.raises(RuntimeError):
+        with atomic_output(path) as tmp_file:
+            tmp_file.write_text('partial', encoding='utf-8')
+            raise RuntimeError('interrupted')
+
+    assert path.read_text(encoding='utf-8') == 'old\n'
+    assert list(tmp_path.iterdir()) == [path]
+
+    with atomic_output(path) as tmp_file:
+        tmp_file.write_text('new\n', encoding='utf-8')
+    assert path.read_text(encoding='utf-8') == 'new\n'
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_save_annotated_document(tmp_path):
+    document = lx.data.AnnotatedDocument(text='チケット番号: BUG-1', extractions=[
+        lx.data.Extraction(extraction_class='チケット番号', extraction_text='BUG-1',
+                           char_interval=lx.data.CharInterval(start_pos=8, end_pos=13)),
+    ])
+    path = tmp_path / 'doc_results.jsonl'
+
+    save_annotated_document(document, path)
+
+    assert list(tmp_path.iterdir()) == [path]
+    saved = json.loads(path.read_text(encoding='utf-8'))
+    assert saved['extractions'][0]['extraction_text'] == 'BUG-1'
+
+
+def _ticket(number, cause='設定値の誤り'):
+    headers = (f"チケット番号: BUG-{number}\n作成日: 2024-01-01\n最終更新日: 2024-01-02\n"
+               f"タイトル: ログインできない{number}\n\n")
+    bodies = {section: f"{section}の内容" for section in text_analyzer_bugtickets.TEMPLATE_SECTIONS}
+    bodies['原因'] = cause
+    return headers + ''.join(f"■ {section}\n{body}\n\n" for section, body in bodies.items())
+
+
+def _run_bugtickets(monkeypatch, capsys, *args):
+    monkeypatch.setattr(sys, 'argv', ['text_analyzer_bugtickets.py', '--stub', '--no-cache', '--no-html', *args])
+    text_analyzer_bugtickets.main()
+    return capsys.readouterr().out
+
+
+@pytest.mark.parametrize('batch_args', [[], ['--batch-tokens', '1000']])
+def test_resume_skips_completed_and_reruns_changed(tmp_path, monkeypatch, capsys, batch_args):
+    # 定型フォーマットのチケットはLLMを使わずに処理される
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'input').mkdir()
+    for number in (1, 2):
+        (tmp_path / 'input' / f'ticket{number}.md').write_text(_ticket(number), encoding='utf-8')
+
+    output = _run_bugtickets(monkeypatch, capsys, *batch_args)
+    assert output.count('Processed and saved results') == 2
+
+    output = _run_bugtickets(monkeypatch, capsys, '--resume', *batch_args)
+    assert 'All files have already been processed' in output
+
+    # 内容が変わったファイルと出力が失われたファイルだけを処理し直す
+    changed = tmp_path / 'input' / 'ticket1.md'
+    changed.write_text(_ticket(1, cause='タイムアウト値の誤り'), encoding='utf-8')
+    output = _run_bugtickets(monkeypatch, capsys, '--resume', *batch_args)
+    assert 'Resuming: skipping 1 completed files' in output
+    assert 'out/ticket1_*' in output and 'out/ticket2_*' not in output
+
+    (tmp_path / 'out' / 'ticket2_results.jsonl').unlink()
+    output = _run_bugtickets(monkeypatch, capsys, '--resume', *batch_args)
+    assert 'out/ticket2_*' in output and 'out/ticket1_*' not in output
+
+    journal = ExtractionJournal(tmp_path / 'out' / text_analyzer_bugtickets.JOURNAL_NAME)
+    assert journal.is_completed('ticket1.md', text_sha256(changed.read_text(encoding='utf-8')))
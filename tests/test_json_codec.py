@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""json_codec.py のテスト（どのライブラリでも標準ライブラリのjsonと同じ結果になること）"""
+
+import json
+import math
+import random
+
+import pytest
+
+from json_codec import AVAILABLE_BACKENDS, JsonCodec
+
+
+# 高速なライブラリと標準ライブラリで表記や解析結果が異なりうる値
+TRICKY_VALUES = [
+    {'text': '日本語と絵文字🎉', 'escape': '"\\\n\t\u0001', 'nested': [{'a': [1, 2.5, None, True]}]},
+    {'big': 2 ** 64, 'negative_big': -(2 ** 70), 'int64_max': 2 ** 63 - 1},
+    {'small': 1e-05, 'large': 1e16, 'exponent': 1.5e300, 'tiny': 5e-324, 'plain': 0.0001, 'zero': -0.0},
+    {'nan': math.nan, 'inf': math.inf, 'negative_inf': -math.inf},
+    {1: 'int key', None: 'none key', 2.5: 'float key'},
+    {'looks_like_marker': 'null 0e 0.0000', 'digits': '1234567890123456789012'},
+    [],
+    {},
+    '',
+]
+
+
+@pytest.fixture(params=AVAILABLE_BACKENDS)
+def codec(request):
+    return JsonCodec(request.param)
+
+
+@pytest.mark.parametrize('value', TRICKY_VALUES)
+@pytest.mark.parametrize('options', [{}, {'indent': 2}, {'separators': (',', ':')}, {'indent': 4}])
+def test_dumps_matches_stdlib(codec, value, options):
+    assert codec.dumps(value, **options) == json.dumps(value, ensure_ascii=False, **options)
+
+
+def test_dumps_random_floats_match_stdlib(codec):
+    rng = random.Random(0)
+    values = [rng.uniform(-1, 1) * 10 ** rng.randint(-30, 30) for _ in range(2000)]
+    assert codec.dumps(values) == json.dumps(values, ensure_ascii=False)
+
+
+@pytest.mark.parametrize('text', [
+    '{"a": 12345678901234567890123, "b": -98765432109876543210}',
+    '[NaN, Infinity, -Infinity]',
+    '{"s": "\\ud800"}',
+    '{"a": 1.0, "b": 1e400, "c": "日本語"}',
+    '  [1, 2, 3]\n',
+])
+def test_loads_matches_stdlib(codec, text):
+    expected = json.loads(text)
+    for data in (text, text.encode('utf-8')):
+        result = codec.loads(data)
+        # NaNは自身と等しくないため、文字列表現で比較する
+        assert repr(result) == repr(expected)
+        assert type(result) is type(expected)
+
+
+@pytest.mark.parametrize('text', ['{"a": }', '[1, 2', ''])
+def test_loads_raises_stdlib_error(codec, text):
+    with pytest.raises(json.JSONDecodeError):
+        codec.loads(text)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        JsonCodec('no-such-backend')
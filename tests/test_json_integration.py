@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""json_integration.py のテスト"""
+
+import json
+import random
+import sys
+
+import pytest
+
+import json_integration
+from json_integration import (MANIFEST_NAME, ExtractionRecord, IntegrationManifest, LangExtractIntegrator,
+                              integrate_corpus)
+
+
+def _extraction(extraction_class, text, attributes):
+    return {
+        'extraction_class': extraction_class,
+        'extraction_text': text,
+        'char_interval': {'start_pos': 0, 'end_pos': len(text)},
+        'alignment_status': 'match_exact',
+        'attributes': attributes,
+    }
+
+
+def _sample_lines(seed=0, lines=40, per_line=25):
+    """
+    統合キーの表記ゆれ、複数キーによるグループの連結、数値データ、リスト化する属性、
+    近似重複のテキスト、統合キーのない個別オブジェクトを含む入力データを作成する
+    """
+    rng = random.Random(seed)
+    # 製品0〜9は表記ゆれのある企業名を介して3つのグループに連結され、製品10〜19はそれぞれ単独のグループになる
+    companies = ['ABC株式会社', 'ＡＢＣ株式会社', 'abc 株式会社', 'XYZ Inc.', 'デルタ工業']
+    result = []
+    for _ in range(lines):
+        extractions = []
+        for _ in range(per_line):
+            kind = rng.random()
+            if kind < 0.2:
+                extractions.append(_extraction('note', f'補足{rng.randrange(50)}です。', {'segment': 'その他'}))
+                continue
+            product = rng.randrange(20)
+            attributes = {}
+            if kind < 0.8:
+                attributes['product_name'] = f'製品{product}'
+            if product < 10 and kind > 0.5:
+                attributes['company_name'] = companies[product % len(companies)]
+            if not attributes:
+                attributes['model_name'] = f'製品{product}'
+            if rng.random() < 0.3:
+                attributes.update(value=rng.randrange(100), unit='%', year=str(rng.choice([2024, 2025])))
+            attributes['segment'] = rng.choice(['エネルギー', '車載', ['産業', '医療']])
+            name = next(iter(attributes.values()))
+            text = rng.choice([f'{name}の需要が拡大している。', f'{name}の需要が拡大している', f'{name}は高いシェアを持つ。'])
+            extractions.append(_extraction(rng.choice(['market', 'metric']), text, attributes))
+        result.append(json.dumps({'extractions': extractions}, ensure_ascii=False))
+    return result
+
+
+@pytest.fixture
+def sample_file(tmp_path):
+    path = tmp_path / 'sample_results.jsonl'
+    path.write_text('\n'.join(_sample_lines()) + '\n', encoding='utf-8')
+    return path
+
+
+def test_streaming_matches_in_memory(sample_file, tmp_path):
+    in_memory = LangExtractIntegrator()
+    objects = in_memory.process_file(str(sample_file))
+    in_memory.save_json(str(tmp_path / 'in_memory.json'), objects)
+
+    streaming = LangExtractIntegrator()
+    streaming.save_json(str(tmp_path / 'streaming.json'), streaming.process_file_streaming(str(sample_file)))
+
+    assert (tmp_path / 'streaming.json').read_bytes() == (tmp_path / 'in_memory.json').read_bytes()
+
+
+def test_standalone_ids_are_unique(sample_file):
+    objects = list(LangExtractIntegrator().process_file_streaming(str(sample_file)))
+    standalone_ids = [obj['id'] for obj in objects if obj['id'].startswith('standalone_')]
+
+    assert standalone_ids
+    assert standalone_ids == [f'standalone_{index}' for index in range(len(standalone_ids))]
+    assert len({obj['id'] for obj in objects}) == len(objects)
+
+
+def _membership(objects):
+    """統合オブジェクトのIDごとに、順序に依存しない内容（classesの集合とnumeric_dataの多重集合）を返す"""
+    return {
+        obj['id']: (sorted(obj['classes']),
+                    sorted(json.dumps(row, ensure_ascii=False) for row in obj['attributes'].get('numeric_data', [])))
+        for obj in objects
+    }
+
+
+def test_corpus_matches_concatenated_group_membership(tmp_path):
+    lines = _sample_lines(seed=1, lines=30)
+    input_files = []
+    for index in range(3):
+        path = tmp_path / f'part{index}_results.jsonl'
+        path.write_text('\n'.join(lines[index::3]) + '\n', encoding='utf-8')
+        input_files.append(str(path))
+    concatenated = tmp_path / 'all.jsonl'
+    concatenated.write_text(''.join(open(path, encoding='utf-8').read() for path in input_files), encoding='utf-8')
+
+    corpus_file = tmp_path / 'corpus_integrated.json'
+    assert integrate_corpus(input_files, str(corpus_file), jobs=2, shards=3)
+    corpus = json.loads(corpus_file.read_text(encoding='utf-8'))
+    expected = LangExtractIntegrator().process_file(str(concatenated))
+
+    assert [obj['id'] for obj in corpus] == [obj['id'] for obj in expected]
+    assert _membership(corpus) == _membership(expected)
+
+
+def test_batch_saves_manifest_once(tmp_path, monkeypatch, capsys):
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+    for seed in range(3):
+        (out_dir / f'doc{seed}_results.jsonl').write_text('\n'.join(_sample_lines(seed, lines=5)) + '\n',
+                                                         encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, 'argv', ['json_integration.py'])
+    saves = []
+    original_save = IntegrationManifest.save
+    monkeypatch.setattr(IntegrationManifest, 'save', lambda self: saves.append(1) or original_save(self))
+
+    json_integration.main()
+    # 保存間隔内の一括処理では、マニフェストは最後に1回だけ保存される
+    assert len(saves) == 1
+    manifest = json.loads((out_dir / MANIFEST_NAME).read_text(encoding='utf-8'))
+    assert sorted(manifest['files']) == [f'doc{seed}_results.jsonl' for seed in range(3)]
+
+    json_integration.main()
+    assert 'Skipped 3 unchanged files' in capsys.readouterr().out
+
+
+def test_key_layouts_are_shared_and_bounded():
+    first = ExtractionRecord('market', 'a', {'product_name': 'x', 'year': '2025'})
+    second = ExtractionRecord('metric', 'b', {'product_name': 'y', 'year': '2024'})
+    assert first._attribute_keys is second._attribute_keys
+
+    for index in range(ExtractionRecord.KEY_LAYOUT_CACHE_SIZE + 10):
+        ExtractionRecord('note', 'c', {f'key{index}': index})
+    assert ExtractionRecord._key_layout.cache_info().currsize <= ExtractionRecord.KEY_LAYOUT_CACHE_SIZE
+    assert first.get('attributes') == {'product_name': 'x', 'year': '2025'}
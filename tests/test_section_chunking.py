@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""section_chunking.py のテスト"""
+
+import langextract as lx
+import pytest
+
+from section_chunking import extract_by_sections, shift_extractions, split_sections
+
+
+DOCUMENT = (
+    "前書きの段落。\n\n"
+    "# 市場概況\n市場規模は拡大している。\n\n主要企業はA社とB社。\n"
+    "## 詳細\n" + "A社の売上は増加した。\n" * 12 +
+    "\n" + "B社の売上は横ばい。" * 8 + "\n"
+    "# まとめ\nA社が優位。\n"
+)
+
+
+def _find_extractions(chunk_text, words):
+    """チャンク内で見つかった単語を、チャンク内の文字位置を持つ抽出結果として返す"""
+    extractions = []
+    for word in words:
+        start = chunk_text.find(word)
+        if start != -1:
+            extractions.append(lx.data.Extraction(
+                extraction_class='word',
+                extraction_text=word,
+                char_interval=lx.data.CharInterval(start_pos=start, end_pos=start + len(word)),
+                token_interval=lx.tokenizer.TokenInterval(start_index=0, end_index=1),
+            ))
+    return extractions
+
+
+@pytest.mark.parametrize('max_chars', [10, 30, 60, 100, len(DOCUMENT)])
+def test_split_sections_covers_document(max_chars):
+    chunks = split_sections(DOCUMENT, max_chars)
+
+    assert ''.join(chunk for _, chunk in chunks) == DOCUMENT
+    position = 0
+    for offset, chunk in chunks:
+        assert offset == position
+        assert DOCUMENT[offset:offset + len(chunk)] == chunk
+        assert 0 < len(chunk) <= max_chars
+        position += len(chunk)
+
+
+def test_split_sections_cuts_at_line_boundaries():
+    chunks = split_sections(DOCUMENT, 60)
+
+    # 見出し・段落・行の区切りで分割し、文字数で分割するのは1行が上限を超える場合のみ
+    long_line_start = DOCUMENT.index('B社の売上は横ばい。')
+    long_line_end = DOCUMENT.index('\n', long_line_start)
+    for offset, _ in chunks[1:]:
+        assert DOCUMENT[offset - 1] == '\n' or long_line_start < offset <= long_line_end
+
+
+def test_shift_extractions_maps_to_document_offsets():
+    chunks = split_sections(DOCUMENT, 60)
+    words = ['市場規模', 'A社の売上', 'まとめ', 'A社が優位']
+
+    shifted = []
+    for offset, chunk in chunks:
+        shifted.extend(shift_extractions(_find_extractions(chunk, words), offset))
+
+    assert shifted
+    for extraction in shifted:
+        interval = extraction.char_interval
+        assert DOCUMENT[interval.start_pos:interval.end_pos] == extraction.extraction_text
+        assert extraction.token_interval is None
+
+
+def test_shift_extractions_keeps_missing_positions():
+    extraction = lx.data.Extraction(extraction_class='word', extraction_text='A社')
+    unaligned = lx.data.Extraction(extraction_class='word', extraction_text='B社',
+                                   char_interval=lx.data.CharInterval(start_pos=None, end_pos=None))
+
+    shift_extractions([extraction, unaligned], 100)
+
+    assert extraction.char_interval is None
+    assert unaligned.char_interval.start_pos is None and unaligned.char_interval.end_pos is None
+
+
+def test_extract_by_sections_returns_document_positions():
+    words = ['前書き', '主要企業', '詳細', 'まとめ', 'A社が優位']
+
+    def extract_chunk(chunk_text):
+        return lx.data.AnnotatedDocument(text=chunk_text, extractions=_find_extractions(chunk_text, words))
+
+    result = extract_by_sections(DOCUMENT, extract_chunk, max_chars=60, max_workers=3)
+
+    assert result.text == DOCUMENT
+    assert [extraction.extraction_text for extraction in result.extractions] == words
+    assert [extraction.extraction_index for extraction in result.extractions] == list(range(1, len(words) + 1))
+    for extraction in result.extractions:
+        interval = extraction.char_interval
+        assert DOCUMENT[interval.start_pos:interval.end_pos] == extraction.extraction_text
@@ -1,12 +1,23 @@
 import langextract as lx
 import textwrap
 import os
+import re
+import bisect
 from pathlib import Path
 from dotenv import load_dotenv
+from visualize_results import write_visualization
+from stub_provider import STUB_PROVIDER_NAME, stub_model_config, use_stub_provider
+from extraction_cache import ExtractionCache, extract_with_cache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from debug_log import debug_print
+from extraction_journal import (ExtractionJournal, atomic_output, save_annotated_document, text_sha256,
+                                STATUS_STARTED, STATUS_DONE, STATUS_FAILED)
 
 # 環境変数の読み込み
 load_dotenv()
 
+# 処理状態のジャーナル（outディレクトリ内、--resumeで参照する）
+JOURNAL_NAME = ".bugtickets_journal.log"
+
 # 1. Define the prompt and extraction rules
 prompt = textwrap.dedent("""\
     以下の不具合チケットから、各項目の情報を抽出してください。
@@ -130,8 +141,86 @@ examples = [
     )
 ]
 
+# 定型フォーマットのチケットを規則で解析するためのパターン
+# ヘッダー行（「項目名: 値」）: 抽出項目名 -> パターン
+TEMPLATE_HEADER_PATTERNS = {
+    "チケット番号": re.compile(r'^チケット番号[ \t]*[:：][ \t]*(.*?)[ \t]*$', re.MULTILINE),
+    "チケット作成日": re.compile(r'^作成日[ \t]*[:：][ \t]*(.*?)[ \t]*$', re.MULTILINE),
+    "チケット最終更新日": re.compile(r'^最終更新日[ \t]*[:：][ \t]*(.*?)[ \t]*$', re.MULTILINE),
+    "タイトル": re.compile(r'^タイトル[ \t]*[:：][ \t]*(.*?)[ \t]*$', re.MULTILINE),
+}
+# セクション見出し（「■ 項目名」）の項目名
+TEMPLATE_SECTIONS = (
+    "概要", "不具合現象", "再現手順", "再現性", "不具合現象の備考",
+    "原因", "修正方法", "水平展開", "不具合修正の備考",
+)
+TEMPLATE_SECTION_PATTERN = re.compile(
+    r'^■[ \t]*(' + '|'.join(TEMPLATE_SECTIONS) + r')[ \t]*$', re.MULTILINE
+)
+
+def parse_ticket_template(text):
+    """
+    定型フォーマットのチケットを規則に基づいて解析する
+
+    promptの13項目がすべて定型フォーマット（TEMPLATE_HEADER_PATTERNSの4つのヘッダー行と、
+    TEMPLATE_SECTIONSの9つの「■ 項目名」のセクション）で一度ずつ現れ、
+    どの項目の内容も空でない場合のみ、LLMと同じ形式の抽出結果を返す。
+    項目が欠けているか内容が空の場合は、抽出漏れを避けるためNoneを返してLLMでの抽出に任せる。
+
+    Args:
+        text: チケット本文
+
+    Returns:
+        抽出結果のAnnotatedDocument（定型フォーマットに一致しないか、内容が空の項目がある場合はNone）
+    """
+    spans = {}
+    for field, pattern in TEMPLATE_HEADER_PATTERNS.items():
+        matches = list(pattern.finditer(text))
+        if len(matches) != 1:
+            return None
+        spans[field] = matches[0].span(1)
+
+    headings = list(TEMPLATE_SECTION_PATTERN.finditer(text))
+    if sorted(match.group(1) for match in headings) != sorted(TEMPLATE_SECTIONS):
+        return None
+    for heading, next_heading in zip(headings, headings[1:] + [None]):
+        start = heading.end()
+        end = next_heading.start() if next_heading else len(text)
+        # 前後の空白・改行を除いた範囲を抽出範囲とする
+        body = text[start:end]
+        start += len(body) - len(body.lstrip())
+        end -= len(body) - len(body.rstrip())
+        spans[heading.group(1)] = (start, max(start, end))
+
+    extractions = []
+    for field in list(TEMPLATE_HEADER_PATTERNS) + list(TEMPLATE_SECTIONS):
+        start, end = spans[field]
+        if start == end:
+            return None
+        extractions.append(lx.data.Extraction(
+            extraction_class=field,
+            extraction_text=text[start:end],
+            char_interval=lx.data.CharInterval(start_pos=start, end_pos=end),
+            alignment_status=lx.data.AlignmentStatus.MATCH_EXACT,
+            extraction_index=len(extractions) + 1,
+        ))
+    return lx.data.AnnotatedDocument(text=text, extractions=extractions)
+
+# 複数のチケットを1回の抽出にまとめる場合の区切りと、プロンプトへの追記
+TICKET_SEPARATOR = "\n\n==========\n\n"
+batch_prompt = prompt + textwrap.dedent("""
+
+    入力に複数の不具合チケットが含まれる場合、チケットは「==========」の行で区切られています。
+    チケットごとに上記の各項目を抽出してください。各項目はチケットごとに一度のみ出現します。""")
+
 def get_model_config(use_local=True):
-    """モデル設定を返す関数"""
+    """
+    モデル設定を返す関数
+
+    環境変数LLM_PROVIDER=stubの場合は、LLMを呼び出さないベンチマーク用のスタブを使用する。
+    """
+    if use_stub_provider():
+        return stub_model_config()
     if use_local:
         return {
             'model_id': 'gemma:2b-instruct',
@@ -148,32 +237,37 @@ def get_model_config(use_local=True):
             'api_key': api_key
         }
 
-def debug_print(debug_mode, *args, **kwargs):
-    """デバッグモードが有効な場合にのみメッセージを表示する"""
-    if debug_mode:
-        print(*args, **kwargs)
+def process_text(text, output_prefix, output_dir, use_local=True, debug_mode=False, cache=None,
+                 use_template=True, write_html=True):
+    """Process a single text and save the results with the given prefix
+
+    cache: 抽出結果のExtractionCache（Noneの場合は常にLLMを呼び出す）
+    use_template: 定型フォーマットのチケットはLLMを使わず規則で解析する
+    write_html: HTMLの可視化を作成する（Falseの場合はvisualize_results.pyで後から作成できる）
 
-def process_text(text, output_prefix, output_dir, use_local=True, debug_mode=False):
-    """Process a single text and save the results with the given prefix"""
+    Returns:
+        保存した出力ファイルのパスのリスト（抽出に失敗した場合はNone）
+    """
+    if use_template:
+        result = parse_ticket_template(text)
+        if result is not None:
+            debug_print(debug_mode, "\n=== Parsed with ticket template (LLM skipped) ===")
+            return save_results(result, output_prefix, output_dir, write_html)
+    
     # Get model configuration
     model_config = get_model_config(use_local)
     
     try:
         debug_print(debug_mode, "\n=== Sending request to LLM ===")
-        debug_print(debug_mode, f"Using model: {model_config.get('model_id', 'unknown')}")
+        debug_print(debug_mode, "Using model:", model_config.get('model_id', 'unknown'))
         
-        # Run the extraction
-        result = lx.extract(
-            text_or_documents=text,
-            prompt_description=prompt,
-            examples=examples,
-            **model_config
-        )
+        # Run the extraction (同じ入力の結果がキャッシュにあればLLMを呼び出さない)
+        result = extract_with_cache(cache, text, prompt, examples, model_config)
         
         # Print the raw response for debugging
         debug_print(debug_mode, "\n=== Raw LLM Response ===")
-        debug_print(debug_mode, f"Response type: {type(result)}")
-        debug_print(debug_mode, f"Response content: {result}")
+        debug_print(debug_mode, "Response type:", type(result))
+        debug_print(debug_mode, "Response content:", result)
         
         if debug_mode and isinstance(result, dict):
             debug_print(debug_mode, "\n=== Response Keys ===")
@@ -182,14 +276,23 @@ def process_text(text, output_prefix, output_dir, use_local=True, debug_mode=Fal
             if 'extractions' not in result:
                 debug_print(debug_mode, "\n!!! WARNING: 'extractions' key not found in response !!!")
                 if 'error' in result:
-                    debug_print(debug_mode, f"Error from API: {result['error']}")
+                    debug_print(debug_mode, "Error from API:", result['error'])
                     
     except Exception as e:
         print(f"\n!!! ERROR during extraction: {str(e)} !!!")
         import traceback
         traceback.print_exc()
-        return  # Exit the function if there was an error
+        return None  # Exit the function if there was an error
 
+    return save_results(result, output_prefix, output_dir, write_html)
+
+def save_results(result, output_prefix, output_dir, write_html=True):
+    """
+    抽出結果をJSONLで保存し、write_htmlがTrueの場合はHTMLの可視化も作成する
+
+    Returns:
+        保存した出力ファイルのパスのリスト
+    """
     # Create output directory if it doesn't exist
     output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -198,17 +301,144 @@ def process_text(text, output_prefix, output_dir, use_local=True, debug_mode=Fal
     html_file = output_dir / f"{output_prefix}_visualization.html"
 
     # Save the results to a JSONL file
-    lx.io.save_annotated_documents([result], output_name=jsonl_file.name, output_dir=str(output_dir))
+    save_annotated_document(result, jsonl_file)
+    outputs = [jsonl_file]
 
-    # Generate the visualization from the file
-    html_content = lx.visualize(str(jsonl_file))
-    with open(html_file, "w", encoding='utf-8') as f:
-        if hasattr(html_content, 'data'):
-            f.write(html_content.data)  # For Jupyter/Colab
-        else:
-            f.write(html_content)
+    # Generate the visualization from the in-memory result (保存したファイルは読み直さない)
+    if write_html:
+        with atomic_output(html_file) as tmp_file:
+            write_visualization(result, tmp_file)
+        outputs.append(html_file)
     
     print(f"Processed and saved results to {output_dir}/{output_prefix}_*")
+    return outputs
+
+def estimate_tokens(text):
+    """トークン数の概算（日本語が中心のため1文字を1トークンとみなす）"""
+    return len(text)
+
+def pack_tickets(tickets, token_budget):
+    """
+    チケットをトークン数の上限までまとめたバッチに分ける
+
+    Args:
+        tickets: (出力プレフィックス, チケット本文)のリスト
+        token_budget: 1バッチのチケット本文の合計トークン数の上限
+
+    Returns:
+        バッチのリスト（上限を超える1件のチケットは単独のバッチになる）
+    """
+    separator_tokens = estimate_tokens(TICKET_SEPARATOR)
+    batches = []
+    current = []
+    current_tokens = 0
+    for ticket in tickets:
+        tokens = estimate_tokens(ticket[1])
+        if current and current_tokens + separator_tokens + tokens > token_budget:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        if current:
+            current_tokens += separator_tokens
+        current.append(ticket)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def split_batch_result(result, texts):
+    """
+    まとめて抽出した結果をチケットごとの文書に分ける
+
+    各抽出結果は文字位置が含まれるチケットに割り当て、文字位置をそのチケット内の位置に戻す。
+    文字位置のない抽出結果は、extraction_textを含む最初のチケットに割り当てる。
+
+    Args:
+        result: 区切り文字列で連結した文書に対する抽出結果
+        texts: 連結したチケット本文のリスト（連結順）
+
+    Returns:
+        チケットごとのAnnotatedDocumentのリスト
+    """
+    offsets = []
+    position = 0
+    for text in texts:
+        offsets.append(position)
+        position += len(text) + len(TICKET_SEPARATOR)
+
+    per_ticket = [[] for _ in texts]
+    for extraction in result.extractions or []:
+        interval = extraction.char_interval
+        if interval is not None and interval.start_pos is not None:
+            index = bisect.bisect_right(offsets, interval.start_pos) - 1
+            offset = offsets[index]
+            if interval.start_pos >= offset + len(texts[index]):
+                # 区切り文字列上の抽出結果は、どのチケットにも属さない
+                continue
+            interval.start_pos -= offset
+            if interval.end_pos is not None:
+                interval.end_pos = min(interval.end_pos - offset, len(texts[index]))
+            extraction.token_interval = None
+        else:
+            index = next((i for i, text in enumerate(texts)
+                          if extraction.extraction_text and extraction.extraction_text in text), None)
+            if index is None:
+                print(f"Warning: Could not assign extraction to a ticket: {extraction.extraction_class}")
+                continue
+        per_ticket[index].append(extraction)
+
+    documents = []
+    for text, extractions in zip(texts, per_ticket):
+        for extraction_index, extraction in enumerate(extractions, 1):
+            extraction.extraction_index = extraction_index
+        documents.append(lx.data.AnnotatedDocument(text=text, extractions=extractions))
+    return documents
+
+def process_batch(tickets, output_dir, use_local=True, debug_mode=False, cache=None,
+                  write_html=True):
+    """
+    複数のチケットを1回の抽出で処理し、チケットごとに結果を保存する
+
+    Args:
+        tickets: (出力プレフィックス, チケット本文)のリスト
+
+    Returns:
+        出力プレフィックスから保存した出力ファイルのパスのリスト（失敗した場合はNone）への辞書
+    """
+    if len(tickets) == 1:
+        output_prefix, text = tickets[0]
+        return {output_prefix: process_text(text, output_prefix, output_dir, use_local, debug_mode, cache,
+                                            use_template=False, write_html=write_html)}
+
+    model_config = get_model_config(use_local)
+    texts = [text for _, text in tickets]
+    combined_text = TICKET_SEPARATOR.join(texts)
+
+    try:
+        debug_print(debug_mode, "\n=== Sending batched request to LLM (%d tickets) ===" % len(tickets))
+        debug_print(debug_mode, "Using model:", model_config.get('model_id', 'unknown'))
+        result = extract_with_cache(cache, combined_text, batch_prompt, examples, model_config)
+    except Exception as e:
+        print(f"\n!!! ERROR during batched extraction: {str(e)} !!!")
+        import traceback
+        traceback.print_exc()
+        return {output_prefix: None for output_prefix, _ in tickets}
+
+    saved = {}
+    for (output_prefix, _), document in zip(tickets, split_batch_result(result, texts)):
+        try:
+            saved[output_prefix] = save_results(document, output_prefix, output_dir, write_html)
+        except Exception as e:
+            saved[output_prefix] = None
+            print(f"Error saving results for {output_prefix}: {str(e)}")
+    return saved
+
+def record_outputs(journal, name, input_hash, outputs, error="extraction failed"):
+    """ファイルの処理結果をジャーナルに記録する（outputsがNoneの場合は失敗として記録する）"""
+    if outputs is None:
+        journal.record(name, input_hash, STATUS_FAILED, error=error)
+    else:
+        journal.record(name, input_hash, STATUS_DONE, outputs)
 
 def main():
     import argparse
@@ -217,9 +447,29 @@ def main():
     parser = argparse.ArgumentParser(description='不具合チケット情報抽出ツール')
     parser.add_argument('--online', action='store_true',
                       help='オンラインのLLM (Gemini-2.5)を使用する')
+    parser.add_argument('--stub', action='store_true',
+                      help='LLMを呼び出さずにスタブの抽出結果を使用する（ベンチマーク用、応答時間は'
+                           'STUB_LLM_LATENCY/STUB_LLM_JITTERで指定）')
     parser.add_argument('--debug', action='store_true',
                       help='デバッグ情報を表示する')
+    parser.add_argument('--no-cache', action='store_true',
+                      help='抽出結果のキャッシュを使用せず、常にLLMを呼び出す')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                      help=f'抽出結果のキャッシュの保存先（既定値: {DEFAULT_CACHE_DIR}）')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                      help='キャッシュの最大サイズ(MB)。超えた場合は古いものから削除する')
+    parser.add_argument('--no-html', action='store_true',
+                      help='HTMLの可視化を作成しない（後から visualize_results.py でまとめて作成できる）')
+    parser.add_argument('--no-template', action='store_true',
+                      help='定型フォーマットのチケットも規則による解析を行わず、常にLLMで抽出する')
+    parser.add_argument('--batch-tokens', type=int, default=0,
+                      help='複数のチケットをこのトークン数（概算）までまとめて1回で抽出する（0の場合はチケットごとに抽出する）')
+    parser.add_argument('--resume', action='store_true',
+                      help=f'前回までに完了したファイル（内容が同じで出力が残っているもの）を省略し、'
+                           f'失敗したファイルと未処理のファイルだけを処理する（out/{JOURNAL_NAME}を参照）')
     args = parser.parse_args()
+    if args.stub:
+        os.environ['LLM_PROVIDER'] = STUB_PROVIDER_NAME
 
     # Define directories
     input_dir = Path("input")
@@ -235,23 +485,92 @@ def main():
         print(f"No markdown files found in {input_dir}/. Please add some .md files to process.")
         return
     
+    # 処理状態のジャーナル（--resumeでは完了済みのファイルを省略する）
+    journal = ExtractionJournal(output_dir / JOURNAL_NAME)
+    if args.resume:
+        pending = [md_file for md_file in md_files
+                   if not journal.is_completed(md_file.name, text_sha256(md_file.read_text(encoding='utf-8')))]
+        if len(pending) < len(md_files):
+            print(f"Resuming: skipping {len(md_files) - len(pending)} completed files")
+        md_files = pending
+        if not md_files:
+            print("All files have already been processed")
+            return
+    
     # モデルの種類を表示
     model_config = get_model_config(not args.online)
     print(f"Using model: {model_config['model_id']}")
     
-    for md_file in md_files:
-        try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Use the filename without extension as the output prefix
-            output_prefix = md_file.stem
-            process_text(content, output_prefix, output_dir, 
-                       use_local=not args.online,
-                       debug_mode=args.debug)
-            
-        except Exception as e:
-            print(f"Error processing {md_file}: {str(e)}")
+    # 抽出結果のキャッシュ
+    cache = None
+    if not args.no_cache:
+        cache = ExtractionCache(Path(args.cache_dir), args.cache_size * 1024 * 1024)
+    
+    if args.batch_tokens > 0:
+        # チケットを読み込み、トークン数の上限までまとめて抽出する
+        # 定型フォーマットのチケットは規則で解析し、残りのみをLLMに送る
+        tickets = []
+        sources = {}  # 出力プレフィックス -> (ファイル名, 入力のハッシュ)
+        for md_file in md_files:
+            input_hash = None
+            try:
+                with open(md_file, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                input_hash = text_sha256(content)
+                journal.record(md_file.name, input_hash, STATUS_STARTED)
+                result = None if args.no_template else parse_ticket_template(content)
+                if result is not None:
+                    outputs = save_results(result, md_file.stem, output_dir, not args.no_html)
+                    journal.record(md_file.name, input_hash, STATUS_DONE, outputs)
+                else:
+                    tickets.append((md_file.stem, content))
+                    sources[md_file.stem] = (md_file.name, input_hash)
+            except Exception as e:
+                print(f"Error processing {md_file}: {str(e)}")
+                if input_hash:
+                    journal.record(md_file.name, input_hash, STATUS_FAILED, error=str(e))
+        
+        batches = pack_tickets(tickets, args.batch_tokens)
+        print(f"Packed {len(tickets)} tickets into {len(batches)} requests")
+        for batch in batches:
+            try:
+                saved = process_batch(batch, output_dir,
+                                      use_local=not args.online,
+                                      debug_mode=args.debug,
+                                      cache=cache,
+                                      write_html=not args.no_html)
+                for output_prefix, outputs in saved.items():
+                    record_outputs(journal, *sources[output_prefix], outputs)
+            except Exception as e:
+                print(f"Error processing batch {', '.join(prefix for prefix, _ in batch)}: {str(e)}")
+                for output_prefix, _ in batch:
+                    record_outputs(journal, *sources[output_prefix], None, error=str(e))
+    else:
+        for md_file in md_files:
+            input_hash = None
+            try:
+                with open(md_file, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                input_hash = text_sha256(content)
+                journal.record(md_file.name, input_hash, STATUS_STARTED)
+                
+                # Use the filename without extension as the output prefix
+                output_prefix = md_file.stem
+                outputs = process_text(content, output_prefix, output_dir, 
+                           use_local=not args.online,
+                           debug_mode=args.debug,
+                           cache=cache,
+                           use_template=not args.no_template,
+                           write_html=not args.no_html)
+                record_outputs(journal, md_file.name, input_hash, outputs)
+                
+            except Exception as e:
+                print(f"Error processing {md_file}: {str(e)}")
+                if input_hash:
+                    record_outputs(journal, md_file.name, input_hash, None, error=str(e))
+    
+    if cache:
+        print(f"\nExtraction cache: {cache.hits} hits, {cache.misses} misses ({cache.cache_dir})")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,46 +1,89 @@
 import langextract as lx
+import json
 import textwrap
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-import logging
+import math
+import re
+import unicodedata
+import threading
+import contextlib
+import io
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from visualize_results import write_visualization
+from stub_provider import STUB_PROVIDER_NAME, stub_model_config, use_stub_provider
+from extraction_cache import ExtractionCache, extract_with_cache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from section_chunking import extract_by_sections, split_sections
+from results_index import filter_results
+import json_codec
+from pipeline_metrics import DocumentMetrics, PipelineMetrics
+from debug_log import debug_logger, debug_print
+from extraction_journal import (ExtractionJournal, atomic_output, save_annotated_document, text_sha256,
+                                STATUS_STARTED, STATUS_DONE, STATUS_FAILED)
 
 # 環境変数の読み込み
 load_dotenv()
 
-class DebugLogger:
-    def __init__(self):
-        self._log_file = None
-        self.logger = logging.getLogger("debug")
-        self.logger.setLevel(logging.DEBUG)
-        self._handler = None
-
-    @property
-    def log_file(self):
-        return self._log_file
-
-    @log_file.setter
-    def log_file(self, path):
-        # 現在のハンドラーを削除
-        if self._handler:
-            self.logger.removeHandler(self._handler)
-            self._handler = None
-
-        self._log_file = path
-        if path:
-            # 新しいファイルハンドラーを作成
-            self._handler = logging.FileHandler(path, mode='w', encoding='utf-8')
-            formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-            self._handler.setFormatter(formatter)
-            self.logger.addHandler(self._handler)
-
-    def debug(self, message):
-        if self._handler:
-            self.logger.debug(message)
-
-# グローバルなデバッグロガーのインスタンスを作成
-debug_logger = DebugLogger()
+# 処理状態のジャーナル（outディレクトリ内、--resumeで参照する）
+JOURNAL_NAME = ".report_journal.log"
+
+class ThreadLocalStdout:
+    """
+    スレッドごとに出力先を切り替える標準出力の代理オブジェクト
+
+    capture()中のスレッドの出力はバッファに蓄積され、それ以外は元の標準出力に書き込まれる。
+    並行処理時にファイルごとの出力をまとめて、入力順に表示するために使用する。
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def capture(self):
+        """現在のスレッドの出力をバッファに切り替える"""
+        buffer = io.StringIO()
+        self._local.buffer = buffer
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer or self._stream).write(text)
+
+    def flush(self):
+        buffer = getattr(self._local, 'buffer', None)
+        (buffer or self._stream).flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+class RateLimiter:
+    """
+    1分あたりのリクエスト数を制限するクラス
+
+    リクエストの開始時刻を一定間隔（60秒 / requests_per_minute）に均して、複数スレッドから安全に呼び出せる。
+    """
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self):
+        """次のリクエスト枠まで待機する"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
 
 # 1. Define the prompt and extraction rules
 prompt = textwrap.dedent("""\
@@ -522,8 +565,72 @@ examples = [
     ),
 ]
 
+class ExampleSelector:
+    """
+    入力文書に近いexamplesを選ぶクラス
+
+    examplesの本文から文字bigramのTF-IDFベクトルを一度だけ作成し、
+    入力文書とのコサイン類似度が高い上位k件を選ぶ。日本語でも分かち書きは不要。
+    """
+    def __init__(self, examples, ngram=2):
+        self.examples = list(examples)
+        self.ngram = ngram
+        counts = [self._ngram_counts(example.text) for example in self.examples]
+        document_frequency = Counter()
+        for count in counts:
+            document_frequency.update(count.keys())
+        total = len(self.examples)
+        self.idf = {
+            gram: math.log((1 + total) / (1 + df)) + 1.0
+            for gram, df in document_frequency.items()
+        }
+        self.vectors = [self._normalize(self._weight(count)) for count in counts]
+
+    def _ngram_counts(self, text):
+        text = re.sub(r'\s+', '', unicodedata.normalize('NFKC', text).lower())
+        return Counter(text[i:i + self.ngram] for i in range(len(text) - self.ngram + 1))
+
+    def _weight(self, counts):
+        # examplesに現れないn-gramは類似度に寄与しないため除外する
+        return {gram: count * self.idf[gram] for gram, count in counts.items() if gram in self.idf}
+
+    @staticmethod
+    def _normalize(vector):
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        return {gram: value / norm for gram, value in vector.items()} if norm else {}
+
+    def select(self, text, k):
+        """
+        入力文書に近いexamplesを返す
+
+        Args:
+            text: 入力文書
+            k: 選ぶ件数（0以下またはexamplesの件数以上の場合はすべて返す）
+
+        Returns:
+            選ばれたexamples（プロンプトが安定するよう元の順序を保つ）
+        """
+        if k <= 0 or k >= len(self.examples):
+            return self.examples
+        query = self._normalize(self._weight(self._ngram_counts(text)))
+        scores = [
+            sum(weight * vector.get(gram, 0.0) for gram, weight in query.items())
+            for vector in self.vectors
+        ]
+        ranked = sorted(range(len(self.examples)), key=lambda i: (-scores[i], i))[:k]
+        return [self.examples[i] for i in sorted(ranked)]
+
+# examplesの類似度インデックス（起動時に一度だけ作成）
+example_selector = ExampleSelector(examples)
+
 def get_model_config(use_local=True):
-    """モデル設定を返す関数"""
+    """
+    モデル設定を返す関数
+
+    環境変数LLM_PROVIDER=stubの場合は、LLMを呼び出さないベンチマーク用のスタブを使用する。
+    """
+    if use_stub_provider():
+        return stub_model_config()
     if use_local:
         return {
             'model_id': 'gemma:2b-instruct',
@@ -540,18 +647,26 @@ def get_model_config(use_local=True):
             'api_key': api_key
         }
 
-def debug_print(debug_mode, *args, **kwargs):
-    """デバッグモードが有効な場合にのみメッセージを表示する"""
-    if debug_mode:
-        # コンソールに出力
-        print(*args, **kwargs)
-        # デバッグログにも出力
-        message = " ".join(str(arg) for arg in args)
-        debug_logger.debug(message)
-
-def process_text(text, output_prefix, output_dir, use_local=True, debug_mode=False):
-    """Process a single text and save the results with the given prefix"""
+def process_text(text, output_prefix, output_dir, use_local=True, debug_mode=False,
+                 rate_limiter=None, cache=None, chunk_size=0, chunk_workers=4, num_examples=0,
+                 write_html=True, metrics=None):
+    """Process a single text and save the results with the given prefix
+
+    rate_limiter: LLMへのリクエスト前に待機するRateLimiter（Noneの場合は制限しない）
+    cache: 抽出結果のExtractionCache（Noneの場合は常にLLMを呼び出す）
+    chunk_size: 文書がこの文字数を超える場合は見出し単位に分割して並列に抽出する（0の場合は分割しない）
+    chunk_workers: 分割時に同時に抽出するチャンク数
+    num_examples: プロンプトに含めるexamplesの数。入力に近いものから選ぶ（0の場合はすべて含める）
+    write_html: HTMLの可視化を作成する（Falseの場合はvisualize_results.pyで後から作成できる）
+    metrics: 段階別の処理時間などを記録するDocumentMetrics（Noneの場合は記録しない）
+
+    Returns:
+        保存した出力ファイルのパスのリスト（抽出に失敗した場合はNone）
+    """
     start_time = datetime.now()
+    if metrics is None:
+        metrics = DocumentMetrics(output_prefix)
+    metrics.chars_in = len(text)
     
     # Get model configuration
     model_config = get_model_config(use_local)
@@ -569,45 +684,77 @@ def process_text(text, output_prefix, output_dir, use_local=True, debug_mode=Fal
         debug_print(debug_mode, "Text content:")
         debug_print(debug_mode, text)
         
-        # Prompt and examples
-        debug_print(debug_mode, "\n=== Prompt and Examples ===")
-        debug_print(debug_mode, "Prompt:")
+        # Prompt（examplesはチャンクごとに選ぶため、選ばれたものを抽出後に表示する）
+        debug_print(debug_mode, "\n=== Prompt ===")
         debug_print(debug_mode, prompt)
-        debug_print(debug_mode, "\nNumber of examples:", len(examples))
-        for i, example in enumerate(examples, 1):
-            debug_print(debug_mode, f"\nExample {i}:")
-            debug_print(debug_mode, f"Input text: {example.text}")
-            debug_print(debug_mode, f"Extractions: {example.extractions}")
-    
+
+    # チャンクごとに選ばれたexamples（lx.extractとキャッシュキーに渡したもの、デバッグ出力用）
+    chunk_texts = [text]
+    selected_examples = {}
+
+    def debug_selected_examples():
+        debug_print(debug_mode, "\n=== Selected Examples ===")
+        for chunk_index, chunk_text in enumerate(chunk_texts, 1):
+            chunk_examples = selected_examples.get(chunk_text)
+            if chunk_examples is None:
+                continue
+            if len(chunk_texts) > 1:
+                debug_print(debug_mode, f"\nChunk {chunk_index}:")
+            debug_print(debug_mode, "Number of examples:", len(chunk_examples), "of", len(examples))
+            for i, example in enumerate(chunk_examples, 1):
+                debug_print(debug_mode, f"\nExample {i}:")
+                debug_print(debug_mode, "Input text:", example.text)
+                debug_print(debug_mode, "Extractions:", example.extractions)
+
     try:
         # LLMリクエストの詳細をログに記録
-        debug_print(debug_mode, "\n=== Sending request to LLM ===")
-        debug_print(debug_mode, f"Using model: {model_config.get('model_id', 'unknown')}")
-        debug_print(debug_mode, "Model configuration:")
-        for key, value in model_config.items():
-            if key != 'api_key':  # APIキーはログに残さない
-                debug_print(debug_mode, f"  {key}: {value}")
+        if debug_mode:
+            debug_print(debug_mode, "\n=== Sending request to LLM ===")
+            debug_print(debug_mode, f"Using model: {model_config.get('model_id', 'unknown')}")
+            debug_print(debug_mode, "Model configuration:")
+            for key, value in model_config.items():
+                if key != 'api_key':  # APIキーはログに残さない
+                    debug_print(debug_mode, f"  {key}: {value}")
         
         request_time = datetime.now()
-        debug_print(debug_mode, f"Request time: {request_time.isoformat()}")
+        if debug_mode:
+            debug_print(debug_mode, f"Request time: {request_time.isoformat()}")
         
-        # Run the extraction
-        result = lx.extract(
-            text_or_documents=text,
-            prompt_description=prompt,
-            examples=examples,
-            **model_config
-        )
+        # Run the extraction (同じ入力の結果がキャッシュにあればLLMを呼び出さない)
+        def extract_chunk(chunk_text):
+            with metrics.stage('example_selection'):
+                chunk_examples = example_selector.select(chunk_text, num_examples)
+            if debug_mode:
+                selected_examples[chunk_text] = chunk_examples
+            with metrics.stage('llm'):
+                return extract_with_cache(
+                    cache, chunk_text, prompt, chunk_examples, model_config,
+                    before_request=rate_limiter.acquire if rate_limiter else None
+                )
         
-        response_time = datetime.now()
-        debug_print(debug_mode, f"Response received time: {response_time.isoformat()}")
-        debug_print(debug_mode, f"Response time: {response_time - request_time}")
+        if chunk_size > 0 and len(text) > chunk_size:
+            # 長い文書は見出し単位に分割して並列に抽出し、文字位置を元の文書に戻す
+            if debug_mode:
+                chunks = split_sections(text, chunk_size)
+                chunk_texts = [chunk_text for _, chunk_text in chunks]
+                debug_print(debug_mode, f"Splitting into {len(chunks)} chunks (max {chunk_size} characters)")
+            result = extract_by_sections(text, extract_chunk, chunk_size, chunk_workers)
+        else:
+            result = extract_chunk(text)
+        metrics.record_result(result)
         
-        # Print the raw response for debugging
-        debug_print(debug_mode, "\n=== Raw LLM Response ===")
-        debug_print(debug_mode, f"Response type: {type(result)}")
-        debug_print(debug_mode, f"Response content:")
-        debug_print(debug_mode, result)
+        if debug_mode:
+            debug_selected_examples()
+            response_time = datetime.now()
+            debug_print(debug_mode, f"Response received time: {response_time.isoformat()}")
+            debug_print(debug_mode, f"Response time: {response_time - request_time}",
+                        fields={'elapsed_seconds': (response_time - request_time).total_seconds()})
+            
+            # Print the raw response for debugging
+            debug_print(debug_mode, "\n=== Raw LLM Response ===")
+            debug_print(debug_mode, f"Response type: {type(result)}")
+            debug_print(debug_mode, "Response content:")
+            debug_print(debug_mode, result)
         
         if debug_mode and isinstance(result, dict):
             debug_print(debug_mode, "\n=== Response Analysis ===")
@@ -627,17 +774,19 @@ def process_text(text, output_prefix, output_dir, use_local=True, debug_mode=Fal
                     debug_print(debug_mode, f"Error from API: {result['error']}")
                     
     except Exception as e:
+        metrics.errors += 1
         error_time = datetime.now()
         error_msg = f"\n!!! ERROR during extraction: {str(e)} !!!"
         print(error_msg)
         if debug_mode:
+            debug_selected_examples()
             debug_print(debug_mode, "\n=== Error Details ===")
             debug_print(debug_mode, f"Error time: {error_time.isoformat()}")
             debug_print(debug_mode, error_msg)
             debug_print(debug_mode, "\nStack trace:")
             import traceback
             debug_print(debug_mode, traceback.format_exc())
-        return  # Exit the function if there was an error
+        return None  # Exit the function if there was an error
 
     # Create output directory if it doesn't exist
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -650,17 +799,19 @@ def process_text(text, output_prefix, output_dir, use_local=True, debug_mode=Fal
     if debug_mode:
         debug_print(debug_mode, "\n=== Saving Results ===")
         debug_print(debug_mode, f"JSONL file: {jsonl_file}")
-        debug_print(debug_mode, f"HTML file: {html_file}")
+        if write_html:
+            debug_print(debug_mode, f"HTML file: {html_file}")
     
-    lx.io.save_annotated_documents([result], output_name=jsonl_file.name, output_dir=str(output_dir))
+    with metrics.stage('save'):
+        save_annotated_document(result, jsonl_file)
+    outputs = [jsonl_file]
 
-    # Generate the visualization from the file
-    html_content = lx.visualize(str(jsonl_file))
-    with open(html_file, "w", encoding='utf-8') as f:
-        if hasattr(html_content, 'data'):
-            f.write(html_content.data)  # For Jupyter/Colab
-        else:
-            f.write(html_content)
+    # Generate the visualization from the in-memory result (保存したファイルは読み直さない)
+    if write_html:
+        with metrics.stage('visualize'):
+            with atomic_output(html_file) as tmp_file:
+                write_visualization(result, tmp_file)
+        outputs.append(html_file)
     
     completion_message = f"Processed and saved results to {output_dir}/{output_prefix}_*"
     print(completion_message)
@@ -672,21 +823,156 @@ def process_text(text, output_prefix, output_dir, use_local=True, debug_mode=Fal
         debug_print(debug_mode, completion_message)
         debug_print(debug_mode, f"Total processing time: {end_time - start_time}")
 
+    return outputs
+
+def process_file(md_file, index, total_files, output_dir, args, rate_limiter=None, cache=None,
+                 metrics=None, journal=None):
+    """
+    入力ファイル1件を処理する（エラーはファイル単位で表示し、他のファイルの処理は続行する）
+
+    metrics: 処理時間などを記録するPipelineMetrics（Noneの場合は記録しない）
+    journal: 処理状態を記録するExtractionJournal（Noneの場合は記録しない）
+    """
+    if not md_file.exists():
+        print(f"Skipping missing file [{index}/{total_files}]: {md_file.name}")
+        return
+    print(f"\n📄 Processing file [{index}/{total_files}]: {md_file.name}")
+    document_metrics = metrics.document(md_file.stem) if metrics else DocumentMetrics(md_file.stem)
+    input_hash = None
+    try:
+        with open(md_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if journal:
+            input_hash = text_sha256(content)
+            journal.record(md_file.name, input_hash, STATUS_STARTED)
+        output_prefix = md_file.stem
+        # --debug有効時はファイルごとにデバッグログ出力先を設定
+        if args.debug:
+            debug_logger.log_file = output_dir / f"debug_{md_file.stem}.log"
+        else:
+            debug_logger.log_file = None
+        outputs = process_text(content, output_prefix, output_dir, 
+                   use_local=not args.online,
+                   debug_mode=args.debug,
+                   rate_limiter=rate_limiter,
+                   cache=cache,
+                   chunk_size=args.chunk_size,
+                   chunk_workers=args.chunk_workers,
+                   num_examples=args.num_examples,
+                   write_html=not args.no_html,
+                   metrics=document_metrics)
+        if outputs is None:
+            if journal:
+                journal.record(md_file.name, input_hash, STATUS_FAILED, error="extraction failed")
+            return
+        result_file = output_dir / f"{output_prefix}_results.jsonl"
+        if args.filter_class or args.filter_attribute:
+            with document_metrics.stage('filter'):
+                filtered = filter_results(
+                    result_file,
+                    class_name=args.filter_class,
+                    attribute_name=args.filter_attribute,
+                    attribute_value=args.filter_value
+                )
+            if filtered:
+                filtered_file = output_dir / f"{output_prefix}_filtered_results.jsonl"
+                with atomic_output(filtered_file) as tmp_file:
+                    with open(tmp_file, 'w', encoding='utf-8') as f:
+                        for result in filtered:
+                            f.write(json_codec.dumps(result))
+                            f.write('\n')
+                outputs.append(filtered_file)
+                print(f"Filtered results saved to {filtered_file}")
+        if journal:
+            journal.record(md_file.name, input_hash, STATUS_DONE, outputs)
+    except Exception as e:
+        document_metrics.errors += 1
+        print(f"Error processing {md_file}: {str(e)}")
+        if journal and input_hash:
+            journal.record(md_file.name, input_hash, STATUS_FAILED, error=str(e))
+
+def process_files_concurrently(md_files, output_dir, args, rate_limiter=None, cache=None,
+                               metrics=None, journal=None):
+    """
+    複数ファイルをスレッドプールで並行処理する
+
+    LLMの応答待ちが処理時間の大半を占めるため、最大args.concurrency件のリクエストを同時に送る。
+    各ファイルの出力はファイルごとにまとめ、処理の完了順ではなく入力順に表示する。
+    """
+    total_files = len(md_files)
+    stdout = ThreadLocalStdout(sys.stdout)
+
+    def run(index, md_file):
+        with stdout.capture() as buffer:
+            try:
+                process_file(md_file, index, total_files, output_dir, args, rate_limiter, cache,
+                             metrics, journal)
+            finally:
+                debug_logger.log_file = None
+        return buffer.getvalue()
+
+    original_stdout = sys.stdout
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = [executor.submit(run, index, md_file)
+                       for index, md_file in enumerate(md_files, 1)]
+            for future in futures:
+                original_stdout.write(future.result())
+                original_stdout.flush()
+    finally:
+        sys.stdout = original_stdout
+
 def main():
     import argparse
     from pathlib import Path
-    global debug_logger
-
-    # filter_results関数をインポート
-    # filter_resultsはこのモジュール内で定義されているので、明示的なインポートは不要
-
     # コマンドライン引数の設定
     parser = argparse.ArgumentParser(description='不具合チケット情報抽出ツール')
     parser.add_argument('--online', action='store_true',
                       help='オンラインのLLM (Gemini-2.5)を使用する')
+    parser.add_argument('--stub', action='store_true',
+                      help='LLMを呼び出さずにスタブの抽出結果を使用する（ベンチマーク用、応答時間は'
+                           'STUB_LLM_LATENCY/STUB_LLM_JITTERで指定）')
     parser.add_argument('--debug', action='store_true',
                       help='デバッグ情報を表示する')
+    parser.add_argument('--concurrency', type=int, default=1,
+                      help='同時に処理するファイル数（LLMへの同時リクエスト数、既定値: 1）')
+    parser.add_argument('--rpm', type=int, default=0,
+                      help='オンラインのLLM使用時の1分あたりの最大リクエスト数（0の場合は制限しない）')
+    parser.add_argument('--num-examples', type=int, default=0,
+                      help='プロンプトに含めるexamplesの数。入力に近いものから選ぶ（0の場合はすべて含める）')
+    parser.add_argument('--chunk-size', type=int, default=0,
+                      help='この文字数を超えるレポートを見出し単位に分割して並列に抽出する（0の場合は分割しない）')
+    parser.add_argument('--chunk-workers', type=int, default=4,
+                      help='分割したチャンクを同時に抽出する数（既定値: 4）')
+    parser.add_argument('--no-html', action='store_true',
+                      help='HTMLの可視化を作成しない（後から visualize_results.py でまとめて作成できる）')
+    parser.add_argument('--filter-class',
+                      help='このクラスの抽出結果を *_filtered_results.jsonl に保存する')
+    parser.add_argument('--filter-attribute',
+                      help='この属性を持つ抽出結果を *_filtered_results.jsonl に保存する')
+    parser.add_argument('--filter-value',
+                      help='--filter-attributeの属性がこの値の抽出結果だけに絞り込む')
+    parser.add_argument('--metrics', metavar='FILE',
+                      help='このスクリプトの抽出処理について、文書ごとと全体の段階別処理時間'
+                           '（examplesの選択、LLM呼び出し、保存、可視化、絞り込み）、'
+                           '文字数、抽出件数、エラー数をJSONで保存する')
+    parser.add_argument('--metrics-prom', metavar='FILE',
+                      help='全体の計測値をPrometheusのtextfile形式（*.prom）で保存する')
+    parser.add_argument('--no-cache', action='store_true',
+                      help='抽出結果のキャッシュを使用せず、常にLLMを呼び出す')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                      help=f'抽出結果のキャッシュの保存先（既定値: {DEFAULT_CACHE_DIR}）')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                      help='キャッシュの最大サイズ(MB)。超えた場合は古いものから削除する')
+    parser.add_argument('--resume', action='store_true',
+                      help=f'前回までに完了したファイル（内容が同じで出力が残っているもの）を省略し、'
+                           f'失敗したファイルと未処理のファイルだけを処理する（out/{JOURNAL_NAME}を参照）')
     args = parser.parse_args()
+    if args.stub:
+        os.environ['LLM_PROVIDER'] = STUB_PROVIDER_NAME
+    if args.filter_value is not None and not args.filter_attribute:
+        parser.error('--filter-value requires --filter-attribute')
     
     # Define directories
     input_dir = Path("input")
@@ -714,6 +1000,18 @@ def main():
             debug_print(True, f"\n!!! WARNING: {message}")
         return
     
+    # 処理状態のジャーナル（--resumeでは完了済みのファイルを省略する）
+    journal = ExtractionJournal(output_dir / JOURNAL_NAME)
+    if args.resume:
+        pending = [md_file for md_file in md_files
+                   if not journal.is_completed(md_file.name, text_sha256(md_file.read_text(encoding='utf-8')))]
+        if len(pending) < len(md_files):
+            print(f"Resuming: skipping {len(md_files) - len(pending)} completed files")
+        md_files = pending
+        if not md_files:
+            print("All files have already been processed")
+            return
+
     # モデルの種類を表示
     model_config = get_model_config(not args.online)
     model_info = f"Using model: {model_config['model_id']}"
@@ -726,42 +1024,37 @@ def main():
         for md_file in md_files:
             debug_print(True, f"  - {md_file.name}")
     
-    total_files = len(md_files)
-    for index, md_file in enumerate(md_files, 1):
-            if not md_file.exists():
-                print(f"Skipping missing file [{index}/{total_files}]: {md_file.name}")
-                continue
-            print(f"\n📄 Processing file [{index}/{total_files}]: {md_file.name}")
-            try:
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                output_prefix = md_file.stem
-                # --debug有効時はファイルごとにデバッグログ出力先を設定
-                if args.debug:
-                    debug_logger.log_file = output_dir / f"debug_{md_file.stem}.log"
-                else:
-                    debug_logger.log_file = None
-                process_text(content, output_prefix, output_dir, 
-                           use_local=not args.online,
-                           debug_mode=args.debug)
-                result_file = output_dir / f"{output_prefix}_results.jsonl"
-                if result_file.exists() and (args.filter_class or args.filter_attribute):
-                    filtered = filter_results(
-                        result_file,
-                        class_name=args.filter_class,
-                        attribute_name=args.filter_attribute,
-                        attribute_value=args.filter_value
-                    )
-                    if filtered:
-                        filtered_file = output_dir / f"{output_prefix}_filtered_results.jsonl"
-                        import json
-                        with open(filtered_file, 'w', encoding='utf-8') as f:
-                            for result in filtered:
-                                json.dump(result, f, ensure_ascii=False)
-                                f.write('\n')
-                        print(f"Filtered results saved to {filtered_file}")
-            except Exception as e:
-                print(f"Error processing {md_file}: {str(e)}")
+    # Gemini (オンライン) の場合はリクエスト数の上限を守る
+    rate_limiter = None
+    if args.online and args.rpm > 0:
+        rate_limiter = RateLimiter(args.rpm)
+
+    # 抽出結果のキャッシュ
+    cache = None
+    if not args.no_cache:
+        cache = ExtractionCache(Path(args.cache_dir), args.cache_size * 1024 * 1024)
+
+    # 段階別の処理時間などの計測
+    metrics = PipelineMetrics() if args.metrics or args.metrics_prom else None
+
+    if args.concurrency > 1 and len(md_files) > 1:
+        process_files_concurrently(md_files, output_dir, args, rate_limiter, cache, metrics, journal)
+    else:
+        total_files = len(md_files)
+        for index, md_file in enumerate(md_files, 1):
+            process_file(md_file, index, total_files, output_dir, args, rate_limiter, cache, metrics,
+                         journal)
+
+    if cache:
+        print(f"\nExtraction cache: {cache.hits} hits, {cache.misses} misses ({cache.cache_dir})")
+
+    if metrics:
+        if args.metrics:
+            metrics.write_json(Path(args.metrics))
+            print(f"Metrics saved to {args.metrics}")
+        if args.metrics_prom:
+            metrics.write_prometheus(Path(args.metrics_prom))
+            print(f"Prometheus metrics saved to {args.metrics_prom}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
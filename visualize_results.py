@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽出結果のHTML可視化
+
+抽出処理とは独立して、既存の *_results.jsonl から *_visualization.html を作成します。
+抽出スクリプトを --no-html 付きで実行した後に、まとめて可視化する場合に使用します。
+"""
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, List, Tuple
+
+import langextract as lx
+
+
+RESULTS_SUFFIX = "_results.jsonl"
+VISUALIZATION_SUFFIX = "_visualization.html"
+
+
+def visualization_path(results_file: Path) -> Path:
+    """
+    抽出結果ファイルに対応するHTMLファイルのパスを返す
+
+    Args:
+        results_file: *_results.jsonl のパス
+
+    Returns:
+        同じディレクトリの *_visualization.html のパス
+    """
+    results_file = Path(results_file)
+    prefix = results_file.name[:-len(RESULTS_SUFFIX)] if results_file.name.endswith(RESULTS_SUFFIX) \
+        else results_file.stem
+    return results_file.with_name(prefix + VISUALIZATION_SUFFIX)
+
+
+def write_visualization(source: Any, html_file: Path) -> None:
+    """
+    抽出結果を可視化してHTMLファイルに保存する
+
+    Args:
+        source: AnnotatedDocument（メモリ上の抽出結果）またはJSONLファイルのパス
+        html_file: 出力するHTMLファイルのパス
+    """
+    html_content = lx.visualize(source)
+    with open(html_file, "w", encoding='utf-8') as f:
+        if hasattr(html_content, 'data'):
+            f.write(html_content.data)  # For Jupyter/Colab
+        else:
+            f.write(html_content)
+
+
+def _visualize_file(results_file: str) -> Tuple[str, str]:
+    """
+    ワーカープロセスで1ファイルを可視化する
+
+    Returns:
+        (抽出結果ファイル, エラーメッセージ（成功時は空文字列）)のタプル
+    """
+    try:
+        write_visualization(results_file, visualization_path(Path(results_file)))
+        return results_file, ""
+    except Exception as e:
+        return results_file, str(e)
+
+
+def is_up_to_date(results_file: Path) -> bool:
+    """HTMLファイルが抽出結果ファイルより新しければTrue"""
+    html_file = visualization_path(results_file)
+    return html_file.exists() and html_file.stat().st_mtime >= results_file.stat().st_mtime
+
+
+def visualize_files(results_files: List[Path], jobs: int = 1) -> int:
+    """
+    複数の抽出結果ファイルを可視化する
+
+    Args:
+        results_files: *_results.jsonl のパスのリスト
+        jobs: 並列に処理するプロセス数
+
+    Returns:
+        失敗したファイル数
+    """
+    failures = 0
+    names = [str(path) for path in results_files]
+    if jobs > 1 and len(names) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(names))) as executor:
+            results = list(executor.map(_visualize_file, names))
+    else:
+        results = map(_visualize_file, names)
+
+    for results_file, error in results:
+        if error:
+            failures += 1
+            print(f"✗ Failed to visualize {results_file}: {error}")
+        else:
+            print(f"✓ {visualization_path(Path(results_file))}")
+    return failures
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(
+        description='既存の抽出結果（*_results.jsonl）からHTML可視化を作成する'
+    )
+    parser.add_argument('results_files', nargs='*',
+                        help='抽出結果ファイルのパス（指定しない場合はoutディレクトリ内の全ファイルを処理）')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='並列に処理するプロセス数（既定値: 1）')
+    parser.add_argument('--force', action='store_true',
+                        help='HTMLが抽出結果より新しい場合も作成し直す')
+    args = parser.parse_args()
+
+    if args.results_files:
+        results_files = [Path(path) for path in args.results_files]
+    else:
+        # フィルタ結果（*_filtered_results.jsonl）は文書ではないため除く
+        results_files = sorted(path for path in Path("out").glob(f"*{RESULTS_SUFFIX}")
+                               if not path.name.endswith("_filtered" + RESULTS_SUFFIX))
+
+    if not args.force:
+        results_files = [path for path in results_files
+                         if not (path.exists() and is_up_to_date(path))]
+
+    if not results_files:
+        print("No results files to visualize")
+        return
+
+    print(f"Visualizing {len(results_files)} results files")
+    if visualize_files(results_files, args.jobs):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()